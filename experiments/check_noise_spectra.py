@@ -1,20 +1,22 @@
 from enum import Enum
 
-from numpy import fft, real, imag, sqrt
+from numpy import real, imag, sqrt
 
 from generators.continuous_noise_generator import ContinuousNoiseGenerator
 from generators.pink_noise_generator import PinkNoise
-from generators.proper_pink_noise_generator import PinkNoise as PinkNoise2
+from generators.proper_pink_noise_generator import PinkNoise as PinkNoise2, StreamingPinkNoise
 from generators.running_pink_noise_generator import RunningPinkNoise
 from generators.white_noise_generator import WhiteNoise
 from utils.array import get_normalized
 from utils.base_experiment_settings import *
+from utils.fft_backend import get_fft_backend
 
 
 class Noises(Enum):
     Inter = 'interpolated'
     Pink = 'pink'
     Run = 'running'
+    Stream = 'streaming'
     White = 'white'
 
 
@@ -29,10 +31,12 @@ if __name__ == '__main__':
         if noise_type == Noises.Inter.value:
             noise = ContinuousNoiseGenerator(base_size, base_size, PinkNoise(base_size, base_size), period=base_period)
         elif noise_type == Noises.Pink.value:
-            # Beware! PinkNoise2 is fixed in time length so running it for for longer than 5 s will crash the app
+            # Beware! PinkNoise2 is fixed in time length so running it for longer than `length` loops the noise
             noise = PinkNoise2(base_size, base_size, length=length)
         elif noise_type == Noises.Run.value:
             noise = RunningPinkNoise(base_size, base_size, base_period * 5)
+        elif noise_type == Noises.Stream.value:
+            noise = StreamingPinkNoise(base_size, base_size, fps=fps)
         elif noise_type == Noises.White.value:
             noise = ContinuousNoiseGenerator(base_size, base_size, WhiteNoise(base_size, base_size), period=base_period)
         else:
@@ -43,6 +47,7 @@ if __name__ == '__main__':
             frame = noise.get_next_frame(dt) - .5
             # frame = (np.ones((base_size, base_size))-0.5)
 
+            fft = get_fft_backend()
             f_frame = fft.fftshift(fft.fft2(frame))
             spectra = sqrt(real(f_frame) ** 2 + imag(f_frame) ** 2)
             # spectra = real(f_frame)
@@ -10,7 +10,9 @@ from generators import VideoParsingGenerator
 
 
 def evaluate_experiment(file_name, position):
-    video_generator = VideoParsingGenerator(file_name, live=False)
+    # The evaluation depends only on the order of the values (percentiles),
+    # so the frames can be decoded ahead in single precision and without the per frame rescaling
+    video_generator = VideoParsingGenerator(file_name, live=False, prefetch=8, dtype=np.float32, fixed_range=True)
     patch_shift = (0, 0) if position == 'S' else shift_value
     patch_position_updater = get_position_updater(patch_shift=patch_shift,
                                                   patch_position=patch_position)
@@ -64,6 +66,8 @@ def evaluate_experiment(file_name, position):
         patch_position_updater(dt)
         csv_generator.get_next_frame(dt)
 
+    video_generator.close()
+
 
 def main():
     # variants = ['S']
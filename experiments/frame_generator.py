@@ -1,6 +1,9 @@
 from os import listdir, chdir
 
-from cv2 import VideoCapture, imwrite, CAP_PROP_POS_FRAMES
+import numpy as np
+from cv2 import imwrite
+
+from generators.video_parsing_generator import IndexedVideoParsingGenerator
 
 if __name__ == '__main__':
     # for folder in ['spectra']:
@@ -8,11 +11,14 @@ if __name__ == '__main__':
         chdir(folder)
 
         for video_file in (video_file for video_file in listdir('.') if video_file.endswith('.avi')):
+            # The frames are decoded from the closest keyframe, the index is built only once per video
+            video = IndexedVideoParsingGenerator(video_file, live=False, fixed_range=True)
+
             for fr in [0, 15, 30]:
-                cap = VideoCapture(video_file)
-                cap.set(CAP_PROP_POS_FRAMES, fr)
-                ret, frame = cap.read()
+                frame = video.get_frame(fr)
+
+                imwrite(f'frame_{fr}_{video_file[:-4]}.png', np.rint(frame * 255).astype('uint8'))
 
-                imwrite(f'frame_{fr}_{video_file[:-4]}.png', frame)
+            video.close()
 
         chdir('..')
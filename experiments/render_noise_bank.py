@@ -0,0 +1,23 @@
+import argparse
+
+from generators.noise_bank_generator import render_pink_noise_bank
+from utils.base_experiment_settings import noise_bank_folder, ch_dir
+
+
+def get_command_line_args():
+    # Parse arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", default=1000, type=int, help="Width of the noise frames")
+    parser.add_argument("--height", default=1000, type=int, help="Height of the noise frames")
+    parser.add_argument("--frames", default=100, type=int, help="Number of pre-rendered frames")
+    parser.add_argument("--seed", default=None, type=int, help="Seed of the noise")
+    parser.add_argument("--folder", default=noise_bank_folder, type=str, help="Output folder")
+    return parser.parse_args().__dict__
+
+
+if __name__ == '__main__':
+    args = get_command_line_args()
+    ch_dir(args.pop('folder'))
+
+    output_name = render_pink_noise_bank(**args)
+    print(f'Noise bank written into {output_name}')
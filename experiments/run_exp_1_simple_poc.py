@@ -3,7 +3,6 @@ from base_experiment_settings import *
 from generators.continuous_noise_generator import ContinuousNoiseGenerator
 from generators.gabor_generator import GaborGenerator
 from generators.patched_noise_generator import PatchedNoiseGenerator
-from generators.pink_noise_generator import PinkNoise
 from utils.image import luminance_comparison, contrast_comparison, structural_similarity, phase_invariant_similarity
 from utils.simple_functions import construct_file_name
 
@@ -30,7 +29,7 @@ def main():
                               f'Patch position: {patch_position}\n',
                               ])
 
-            base_noise = ContinuousNoiseGenerator(base_size, base_size, PinkNoise(base_size, base_size),
+            base_noise = ContinuousNoiseGenerator(base_size, base_size, get_pink_noise(base_size, base_size),
                                                   period=base_period)
 
             patch_generator = GaborGenerator(patch_size_deg=patch_size_deg, ppd=ppd)
@@ -3,7 +3,6 @@ from base_experiment_settings import *
 from generators.continuous_noise_generator import ContinuousNoiseGenerator
 from generators.gabor_generator import GaborGenerator
 from generators.patched_noise_generator import PatchedNoiseGenerator
-from generators.pink_noise_generator import PinkNoise
 from utils.image import cw_ssim, ssim
 from utils.patch_compare import PatchComparator
 from utils.simple_functions import construct_file_name
@@ -32,7 +31,7 @@ def main():
                               f'{update_type} update [s^-1]: {update_speed}\n',
                               ])
 
-            base_noise = ContinuousNoiseGenerator(base_size, base_size, PinkNoise(base_size, base_size),
+            base_noise = ContinuousNoiseGenerator(base_size, base_size, get_pink_noise(base_size, base_size),
                                                   period=base_period)
 
             patch_generator = GaborGenerator(patch_size_deg=patch_size_deg, ppd=ppd,
@@ -3,7 +3,6 @@ from base_experiment_settings import *
 from generators.continuous_noise_generator import ContinuousNoiseGenerator
 from generators.gabor_generator import GaborGenerator
 from generators.patched_noise_generator import PatchedNoiseGenerator
-from generators.pink_noise_generator import PinkNoise
 from utils.image import cw_ssim, ssim
 from utils.patch_compare import PatchComparator
 from utils.simple_functions import construct_file_name
@@ -31,7 +30,7 @@ def main():
                               f'Position update (x, y) [s^-1]: {(patch_shift_x, patch_shift_y)}\n',
                               ])
 
-            base_noise = ContinuousNoiseGenerator(base_size, base_size, PinkNoise(base_size, base_size),
+            base_noise = ContinuousNoiseGenerator(base_size, base_size, get_pink_noise(base_size, base_size),
                                                   period=base_period)
 
             patch_generator = GaborGenerator(patch_size_deg=patch_size_deg, ppd=ppd)
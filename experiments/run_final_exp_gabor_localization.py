@@ -1,18 +1,15 @@
 import argparse
 
-import numpy as np
-
 from base_experiment_settings import *
 from generators.continuous_noise_generator import ContinuousNoiseGenerator
 from generators.gabor_generator import GaborGenerator
 from generators.patched_noise_generator import PatchedNoiseGenerator
-from generators.pink_noise_generator import PinkNoise
 from noise_processing.diff_noise_generator import DifferenceNoiseGenerator, PureDifferenceNoiseGenerator, \
     AvgDifferenceNoiseGenerator
 from noise_processing.heat_map_generator import HeatMapGenerator
+from noise_processing.ssim_heat_map_generator import SSIMHeatMapGenerator, PatternSSIMHeatMapGenerator
 from outputs.video_output import VideoOutput
-from utils.array import transform_to_probabilistic_distribution, value_fill
-from utils.image import ssim
+from utils.array import transform_to_probabilistic_distribution
 from utils.patch_compare import PatchComparator
 from utils.simple_functions import construct_file_name
 
@@ -54,7 +51,7 @@ def run_experiment(exp_name,
                    freq_speed: int = None, ):
     width = height = scene_size
 
-    base_noise = ContinuousNoiseGenerator(width, height, PinkNoise(width, height), period=period)
+    base_noise = ContinuousNoiseGenerator(width, height, get_pink_noise(width, height), period=period, prefetch=2)
     update_list = [] if theta_speed is None else [
         *get_patch_value_updates('theta', theta_speed),
         *get_patch_value_updates('phase', phase_speed),
@@ -72,44 +69,18 @@ def run_experiment(exp_name,
 
     # TODO: tmp variable to be used in later check
     diff_noise = None
-    if 'ssim' in exp_name:
-        if 'true' in exp_name:
-            def get_ssim(window):
-                return ssim(window, patch_generator.get_normalized_patch(), alpha=0, beta=-0.5, gamma=0.5)
-        else:
-            patch_comparator = PatchComparator(patch_size_deg, ppd, detect_gabor=True, granularity=granularities)
-
-            def get_ssim(window):
-                return patch_comparator.get_best_ssim_match(window)
-
-        def get_window_ssim(x1, x2, y1, y2):
-            window = noise_with_gabor.get_next_frame(0)[x1:x2, y1: y2]
-
-            if window.shape != (patch_size, patch_size):
-                x = y = 0
-                if window.shape[0] < patch_size and x1 == 0:
-                    x = patch_size // 2
-                if window.shape[1] < patch_size and y1 == 0:
-                    y = patch_size // 2
+    if 'ssim' in exp_name and 'true' in exp_name:
+        heat_map = SSIMHeatMapGenerator(noise_with_gabor, patch_generator.get_normalized_patch,
+                                        alpha=0, beta=-0.5, gamma=0.5, window_size=patch_size,
+                                        aggregate_function=transform_to_probabilistic_distribution)
 
-                window = value_fill(window, x, y, (patch_size, patch_size), value=0)
+    elif 'ssim' in exp_name:
+        patch_comparator = PatchComparator(patch_size_deg, ppd, detect_gabor=True, granularity=granularities)
 
-            return get_ssim(window)
-
-        heat_map = HeatMapGenerator(noise_with_gabor, window_size=patch_size,
-                                    aggregate_function=transform_to_probabilistic_distribution,
-                                    process_function=get_window_ssim)
+        heat_map = PatternSSIMHeatMapGenerator(noise_with_gabor, patch_comparator, window_size=patch_size,
+                                               aggregate_function=transform_to_probabilistic_distribution)
 
     else:
-        def get_window_diff(x1, x2, y1, y2, diff_mean):
-            movement = np.abs(diff_noise.get_next_frame(0)[x1:x2, y1:y2].mean() - diff_mean)
-            return movement
-
-        def get_scene_properties():
-            return {
-                'diff_mean': diff_noise.get_next_frame(0).mean(),
-            }
-
         if 'pure' in exp_name:
             diff_noise = PureDifferenceNoiseGenerator(noise_with_gabor)
         elif 'avg' in exp_name:
@@ -119,8 +90,7 @@ def run_experiment(exp_name,
 
         heat_map = HeatMapGenerator(diff_noise, window_size=patch_size,
                                     aggregate_function=transform_to_probabilistic_distribution,
-                                    compute_cached_values=get_scene_properties,
-                                    process_function=get_window_diff)
+                                    statistic='mean_abs_deviation')
 
     output_name = construct_file_name(exp_name)
     with open(output_name + '.log', 'w') as f:
@@ -149,6 +119,7 @@ def run_experiment(exp_name,
 
     video_output.run()
     video_output.__del__()
+    base_noise.close()
 
 
 def main():
@@ -1,21 +1,21 @@
 import argparse
 from typing import List, Tuple, Callable
 
-import numpy as np
 from numpy import ndarray
 
 from base_experiment_settings import *
 from generators.continuous_noise_generator import ContinuousNoiseGenerator
 from generators.gabor_generator import GaborGenerator
+from generators.graph_executor import GraphExecutor
 from generators.patched_noise_generator import PatchedNoiseGenerator
-from generators.pink_noise_generator import PinkNoise
 from generators.single_noise_generator import SingleNoiseGenerator
 from noise_processing.diff_noise_generator import DifferenceNoiseGenerator, PureDifferenceNoiseGenerator, \
     AvgDifferenceNoiseGenerator
 from noise_processing.heat_map_generator import HeatMapGenerator
+from noise_processing.ssim_heat_map_generator import SSIMHeatMapGenerator, PatternSSIMHeatMapGenerator
 from outputs.video_output import VideoOutput
-from utils.array import transform_to_probabilistic_distribution, value_fill
-from utils.image import ssim, cw_ssim
+from utils.array import transform_to_probabilistic_distribution, get_filled_window
+from utils.image import cw_ssim
 from utils.patch_compare import PatchComparator
 from utils.simple_functions import construct_file_name
 
@@ -75,56 +75,40 @@ def add_diff_noise(noise_type, base_noise, secondary_outputs):
 
     secondary_outputs.append((f'{noise_type}', noise.get_next_frame))
 
-    def get_scene_properties():
-        return {
-            'diff_mean': noise.get_next_frame(0).mean(),
-        }
-
-    def get_window_diff(x1, x2, y1, y2, diff_mean):
-        movement = np.abs(noise.get_next_frame(0)[x1:x2, y1:y2].mean() - diff_mean)
-        return movement
-
+    # The movement of a window is the distance of its mean from the mean of the whole difference frame
     # secondary_outputs.append((f'{noise_type}_heat', heat_map.get_next_frame))
     return HeatMapGenerator(noise, window_size=patch_size, step=patch_size // 4,
                             aggregate_function=transform_to_probabilistic_distribution,
-                            compute_cached_values=get_scene_properties,
-                            process_function=get_window_diff)
+                            statistic='mean_abs_deviation')
 
 
 def add_ssim_noise(noise_type, base_noise, get_patch=None):
+    if noise_type == 'true_ssim':
+        # Compares all the windows with the patch at once (see `SSIMHeatMapGenerator`)
+        return SSIMHeatMapGenerator(base_noise, get_patch, alpha=0, beta=-0.5, gamma=0.5,
+                                    window_size=patch_size, step=patch_size // 4,
+                                    aggregate_function=transform_to_probabilistic_distribution)
+
     if noise_type == 'pattern_ssim':
         patch_comparator = PatchComparator(patch_size_deg, ppd, detect_gabor=True, granularity=granularities['middle'])
 
-        def get_ssim(window):
-            return patch_comparator.get_best_ssim_match(window)
-    elif noise_type == 'true_ssim':
-        def get_ssim(window):
-            return ssim(window, get_patch(), alpha=0, beta=-0.5, gamma=0.5)
+        # Compares all the windows with all the patterns at once
+        return PatternSSIMHeatMapGenerator(base_noise, patch_comparator, window_size=patch_size,
+                                           step=patch_size // 4,
+                                           aggregate_function=transform_to_probabilistic_distribution)
 
-    elif noise_type == 'true_cw_ssim':
-        def get_ssim(window):
-            return cw_ssim(window, get_patch(), alpha=0, beta=-0.5, gamma=0.5)
-    else:
+    if noise_type != 'true_cw_ssim':
         return
 
-    def get_window_pattern_ssim(x1, x2, y1, y2):
-        window = base_noise.get_next_frame(0)[x1:x2, y1: y2]
+    def get_window_cw_ssim(x1, x2, y1, y2):
+        window = get_filled_window(base_noise.get_next_frame(0), x1, x2, y1, y2, patch_size)
 
-        if window.shape != (patch_size, patch_size):
-            x = y = 0
-            if window.shape[0] < patch_size and x1 == 0:
-                x = patch_size // 2
-            if window.shape[1] < patch_size and y1 == 0:
-                y = patch_size // 2
-
-            window = value_fill(window, x, y, (patch_size, patch_size), value=0)
-
-        return get_ssim(window)
+        return cw_ssim(window, get_patch(), alpha=0, beta=-0.5, gamma=0.5)
 
     # secondary_outputs.append((f'{noise_type}_heat', heat_map.get_next_frame))
     return HeatMapGenerator(base_noise, window_size=patch_size, step=patch_size // 4,
                             aggregate_function=transform_to_probabilistic_distribution,
-                            process_function=get_window_pattern_ssim)
+                            process_function=get_window_cw_ssim)
 
 
 def add_noise(noise_type, secondary_outputs, base_noise, get_patch=None):
@@ -139,8 +123,9 @@ def add_noise(noise_type, secondary_outputs, base_noise, get_patch=None):
 def run_experiment(exp_name, env, patch, position, methods=None):
     methods = methods if methods is not None else all_methods
 
-    base_noise = SingleNoiseGenerator(width, height, PinkNoise(width, height)) \
-        if env == 'S' else ContinuousNoiseGenerator(width, height, PinkNoise(width, height), period=period)
+    base_noise = SingleNoiseGenerator(width, height, get_pink_noise(width, height)) \
+        if env == 'S' else ContinuousNoiseGenerator(width, height, get_pink_noise(width, height), period=period,
+                                                    prefetch=2)
 
     update_list = [] if patch == 'S' else [
         *get_patch_value_updates('theta', patch_updates['theta']['middle']),
@@ -179,22 +164,27 @@ def run_experiment(exp_name, env, patch, position, methods=None):
         except ValueError:
             print('Invalid noise type added')
         else:
+            # The heat maps depend only on their input, so they are computed only when it changes (eg. static scenes)
+            heat_map.skip_unchanged = True
             secondary_outputs.append((f'{method}_heat', heat_map.get_next_frame))
 
-    def update_all(dt=1):
-        frame = noise_with_gabor.get_next_frame(dt)
+    # The executor updates the scene and all the secondary outputs exactly once per frame,
+    # the VideoOutput then only reads the frames of the current tick
+    executor = GraphExecutor([noise_with_gabor, *(output.__self__ for _, output in secondary_outputs)])
 
-        # Update secondary outputs that won't be updated by the VideoOutput
-        for _, update_sec_output in secondary_outputs:
-            update_sec_output(dt)
+    def update_all(dt=1):
+        executor.tick(dt)
 
-        return frame
+        return noise_with_gabor.get_next_frame(0)
 
     video_output = VideoOutput(update_all, width, height, secondary_outputs=secondary_outputs,
                                FPS=fps, length=length, video_name=output_name + ".avi")
 
     video_output.run()
     video_output.__del__()
+    executor.close()
+    if isinstance(base_noise, ContinuousNoiseGenerator):
+        base_noise.close()
 
     return output_name
 
@@ -266,6 +266,11 @@ def run_experiment(size=500, length=10, ppd=60, fps=30, exp_name='test', live=Tr
                                                   file_name=output_name + ".csv",
                                                   field_names=fieldnames, output_generators=output_generators)
 
+    # All the outputs only read the frames, so there is no need to copy them for every single value
+    for generator in (base_noise, noise_with_gabor, diff_noise, noise_generator):
+        if generator is not None:
+            generator.zero_copy = True
+
     if live:
         output = PygletOutput(noise_generator.get_next_frame, width, height)
     else:
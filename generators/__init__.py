@@ -1,9 +1,13 @@
 from .circular_noise_generator import CircularNoiseGenerator
 from .continuous_noise_generator import ContinuousNoiseGenerator
-from .gabor_generator import GaborGenerator
+from .gabor_generator import GaborGenerator, PlaidGenerator, CompoundGratingGenerator
+from .graph_executor import GraphExecutor
+from .multi_patch_generator import MultiPatchGenerator
+from .noise_bank_generator import NoiseBankGenerator
 from .noise_generator import StaticNoiseGenerator, NoiseGenerator
 from .patched_noise_generator import PatchedNoiseGenerator
 from .pink_noise_generator import PinkNoise
+from .prefetching_generator import PrefetchingGenerator
 from .running_pink_noise_generator import RunningPinkNoise
 from .single_color_generator import SingleColor
 from .video_parsing_generator import VideoParsingGenerator
@@ -19,5 +23,11 @@ __all__ = [
     GaborGenerator,
     PatchedNoiseGenerator,
     PinkNoise,
-    RunningPinkNoise
+    RunningPinkNoise,
+    NoiseBankGenerator,
+    PrefetchingGenerator,
+    GraphExecutor,
+    PlaidGenerator,
+    CompoundGratingGenerator,
+    MultiPatchGenerator
 ]
@@ -1,7 +1,11 @@
+import numpy as np
 from numpy import ndarray
+from numpy.lib.format import open_memmap
 
+from generators.noise_bank_generator import render_frames
 from generators.noise_generator import StaticNoiseGenerator
 from generators.pink_noise_generator import PinkNoise
+from utils.rng import Seed
 
 
 class CircularNoiseGenerator(StaticNoiseGenerator):
@@ -11,15 +15,40 @@ class CircularNoiseGenerator(StaticNoiseGenerator):
     Every call to `get_next_frame` takes next frame in the sequence. Based on `reverse_return` variable
     different cyclic strategies are used.
 
+    The sequence is stored as one contiguous `(sequence_length, width, height)` array, which is filled in batches
+    if the generator offers `get_frames(n)`. Returned frames are read-only views into the sequence, so there is no
+    copy per frame. Long sequences can be stored in a memory-mapped `.npy` file instead of the memory.
+    Such file can be opened by other processes as well (eg. by `NoiseBankGenerator`).
+
     Parameters
     ----------
     width : int
         Width of the generated noise
 
-    height : int Height of the generated noise generator : StaticNoiseGenerator, optional Generator that is used to
-    pre-generate the frame sequence sequence_length : int, optional Length of the frame sequence reverse_return :
-    bool, optional Defines how is the sequence re-iterated. Either by starting the iteration over (`False` value) or
-    going through the sequence in reversed order (`False` value).
+    height : int
+        Height of the generated noise
+
+    generator : StaticNoiseGenerator, optional
+        Generator that is used to pre-generate the frame sequence
+
+    sequence_length : int, optional
+        Length of the frame sequence
+
+    reverse_return : bool, optional
+        Defines how is the sequence re-iterated. Either by starting the iteration over (`False` value) or
+        going through the sequence in reversed order (`False` value).
+
+    seed : None, int, SeedSequence or Generator, optional
+        Seed of the default `PinkNoise` generator. Ignored if `generator` is set.
+
+    file_name : str, optional
+        Name of the `.npy` file the sequence is memory-mapped to. If not set the sequence is kept in the memory.
+
+    dtype : numpy dtype, optional
+        Type in which the sequence is stored. Defaults to `np.float64`.
+
+    batch_size : int, optional
+        Number of frames rendered at once while filling the sequence.
 
     Methods
     -------
@@ -28,18 +57,29 @@ class CircularNoiseGenerator(StaticNoiseGenerator):
     """
 
     def __init__(self, width: int, height: int, generator: StaticNoiseGenerator = None, sequence_length=2,
-                 reverse_return=True):
+                 reverse_return=True, seed: Seed = None, file_name: str = None, dtype=np.float64, batch_size=16):
         super(CircularNoiseGenerator, self).__init__(width, height)
 
-        generator = generator if generator is not None else PinkNoise(width, height)
-        self.frame_sequence = [generator.get_next_frame() for _ in range(sequence_length)]
+        generator = generator if generator is not None else PinkNoise(width, height, seed=seed)
+
+        shape = (sequence_length, width, height)
+        if file_name is not None:
+            self.frame_sequence = open_memmap(file_name, mode='w+', dtype=dtype, shape=shape)
+        else:
+            self.frame_sequence = np.empty(shape, dtype=dtype)
+
+        render_frames(self.frame_sequence, generator, batch_size)
+        if file_name is not None:
+            self.frame_sequence.flush()
+
+        self.frame_sequence.setflags(write=False)
 
         self.seq_index = 0
         self.direction = +1
         self.start_over = reverse_return
 
     def get_next_frame(self) -> ndarray:
-        frame = self.frame_sequence[self.seq_index].copy()
+        frame = self.frame_sequence[self.seq_index]
 
         self.seq_index += self.direction
 
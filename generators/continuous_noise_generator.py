@@ -1,10 +1,13 @@
 from typing import Callable
 
+import numpy as np
 from numpy import ndarray
 
 from generators.noise_generator import NoiseGenerator, StaticNoiseGenerator
 from generators.pink_noise_generator import PinkNoise
-from utils.simple_functions import interpolate
+from generators.prefetching_generator import PrefetchingGenerator
+from utils.rng import Seed
+from utils.simple_functions import interpolate, INTERPOLATION_KERNELS
 
 
 class ContinuousNoiseGenerator(NoiseGenerator):
@@ -29,10 +32,20 @@ class ContinuousNoiseGenerator(NoiseGenerator):
     two consecutive noise images. The function accepts two noise parameters. The starting noise and it's eventual
     goal noise. Third argument denotes the percentage of similarity (0 being the starting noise, 1 being the goal
     noise). Defaults to linear interpolation of the noises.
+    The interpolation functions from `utils.simple_functions` are replaced with their kernels, which write into
+    a preallocated frame and reuse the difference of the two noises for the whole period.
 
     period : float
         Time period after which new frame from `generator` is generated.
 
+    seed : None, int, SeedSequence or Generator, optional
+        Seed of the default `PinkNoise` generator. Ignored if `generator` is set.
+
+    prefetch : int, optional
+        If positive the frames of `generator` are rendered in advance in a background thread,
+        keeping up to `prefetch` frames ready - see `PrefetchingGenerator`. Defaults to 0 (no prefetching).
+        The thread runs until `close` is called.
+
     Attributes
     ----------
     width : int
@@ -43,15 +56,28 @@ class ContinuousNoiseGenerator(NoiseGenerator):
     """
 
     def __init__(self, width: int, height: int, generator: StaticNoiseGenerator = None,
-                 interpolation: Callable[[ndarray, ndarray, float], ndarray] = interpolate, period=1.):
+                 interpolation: Callable[[ndarray, ndarray, float], ndarray] = interpolate, period=1.,
+                 seed: Seed = None, prefetch=0):
         super(ContinuousNoiseGenerator, self).__init__(width, height)
 
-        self.generator = generator if generator is not None else PinkNoise(width, height)
+        self.generator = generator if generator is not None else PinkNoise(width, height, seed=seed)
+        # Only the prefetching generator created here is closed by `close`, a given one belongs to the caller
+        self.prefetching_generator = None
+        if prefetch > 0 and not isinstance(self.generator, PrefetchingGenerator):
+            self.prefetching_generator = PrefetchingGenerator(self.generator, prefetch)
+            self.generator = self.prefetching_generator
         self.interpolation = interpolation
 
+        self.kernel = INTERPOLATION_KERNELS.get(interpolation)
+
         self.origin = self.generator.get_next_frame()
         self.goal = self.generator.get_next_frame()
 
+        if self.kernel is not None:
+            dtype = np.result_type(self.origin, self.goal)
+            self.delta = np.subtract(self.goal, self.origin, dtype=dtype)
+            self.frame_buffer = np.empty_like(self.delta)
+
         self.period = period
         self.currentTime = 0.0
 
@@ -59,6 +85,9 @@ class ContinuousNoiseGenerator(NoiseGenerator):
         self.origin = self.goal
         self.goal = self.generator.get_next_frame()
 
+        if self.kernel is not None:
+            np.subtract(self.goal, self.origin, out=self.delta)
+
         self.currentTime -= self.period
 
     def __update__(self, dt=1) -> None:
@@ -69,4 +98,13 @@ class ContinuousNoiseGenerator(NoiseGenerator):
 
         perc = self.currentTime / self.period
 
-        self.frame = self.interpolation(self.origin, self.goal, perc)
+        if self.kernel is not None:
+            self.frame = self.kernel(self.origin, self.goal, self.delta, perc, out=self.frame_buffer)
+        else:
+            self.frame = self.interpolation(self.origin, self.goal, perc)
+
+    def close(self) -> None:
+        """Stops the background thread of the prefetching generator created by `prefetch` (if any)."""
+        if self.prefetching_generator is not None:
+            self.prefetching_generator.close()
+            self.prefetching_generator = None
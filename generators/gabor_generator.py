@@ -1,10 +1,12 @@
-from typing import Iterable, Tuple, Callable, TypeVar
+from collections import OrderedDict
+from threading import Lock
+from typing import Iterable, Tuple, Callable, TypeVar, Optional
 
 import numpy as np
-import numpy.fft as fft
 
 from generators.noise_generator import NoiseGenerator
 from utils.array import get_normalized
+from utils.fft_backend import get_fft_backend
 
 
 # TODO: create a `StaticGaborGenerator` which would not compute a new gabor every iteration
@@ -12,6 +14,85 @@ from utils.array import get_normalized
 # TODO: Possibly create a new function that would actually return gabor with given parameters.
 
 
+class GaborPatchCache:
+    """ Bounded LRU cache of rendered gabor patches.
+
+    The patches are keyed by the generator class, patch size, ppd and the quantised `freq`, `theta` and `phase`.
+    Generators using the cache render the patches at the quantised values, so a patch is the same no matter if it
+    was taken from the cache or not. Theta and phase are reduced to one period (360 degrees resp. 1),
+    so periodic schedules (eg. `SinUpdater`, `CircularUpdater`) hit the cache from their second cycle on.
+
+    Cached arrays are read-only - they are shared by all the generators using the cache.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Maximal number of cached patches. Defaults to 256.
+
+    freq_step, theta_step, phase_step : float, optional
+        Quantisation steps of the parameters.
+
+    Attributes
+    ----------
+    hits : int
+        Number of patches taken from the cache.
+
+    misses : int
+        Number of patches that had to be rendered.
+    """
+
+    def __init__(self, max_size=256, freq_step=1e-3, theta_step=1e-2, phase_step=1e-4):
+        self.max_size = max_size
+        self.freq_step = freq_step
+        self.theta_step = theta_step
+        self.phase_step = phase_step
+
+        self.patches = OrderedDict()
+        # The cache can be shared by generators evaluated in different threads (see `GraphExecutor`)
+        self.lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def quantise(self, freq, theta, phase) -> Tuple[int, int, int]:
+        return (int(round(freq / self.freq_step)),
+                int(round((theta % 360) / self.theta_step)) % int(round(360 / self.theta_step)),
+                int(round((phase % 1) / self.phase_step)) % int(round(1 / self.phase_step)))
+
+    def get_values(self, quantised_values: Tuple[int, int, int]) -> Tuple[float, float, float]:
+        freq, theta, phase = quantised_values
+        return freq * self.freq_step, theta * self.theta_step, phase * self.phase_step
+
+    def get(self, key) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self.lock:
+            patches = self.patches.get(key)
+
+            if patches is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.patches.move_to_end(key)
+
+            return patches
+
+    def put(self, key, patches: Tuple[np.ndarray, ...]) -> None:
+        for patch in patches:
+            patch.setflags(write=False)
+
+        with self.lock:
+            self.patches[key] = patches
+            self.patches.move_to_end(key)
+
+            while len(self.patches) > self.max_size:
+                self.patches.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.patches.clear()
+            self.hits = 0
+            self.misses = 0
+
+
 class GaborGenerator(NoiseGenerator):
     """Generator used to generate gabor patches of given size
 
@@ -42,6 +123,10 @@ class GaborGenerator(NoiseGenerator):
     phase: double, optional
         Phase shift of the gabor patch in radians. Defaults to 0.25.
 
+    cache : GaborPatchCache, optional
+        Cache of rendered patches. It can be shared by several generators. If set the patches are rendered
+        at the quantised parameter values (see `GaborPatchCache`). Defaults to None (no cache).
+
     Attributes
     ----------
     freq : int, optional
@@ -73,18 +158,20 @@ class GaborGenerator(NoiseGenerator):
 
     def __init__(self, patch_size_deg, ppd=60,
                  update_list: Iterable[Tuple[str, Callable[[float], AttributeValue]]] = None,
-                 freq=6, theta=45, phase=0.25):
+                 freq=6, theta=45, phase=0.25, cache: GaborPatchCache = None):
         patch_size_px = int(patch_size_deg * ppd)
         super(GaborGenerator, self).__init__(width=patch_size_px, height=patch_size_px)
 
+        self.ppd = ppd
+        self.cache = cache
+
         self.update_list = update_list or []
 
         self.freq = freq  # lambda
         self.theta = theta  # changes orientation
         self.phase = phase
 
-        w = fft.fftshift(fft.fftfreq(patch_size_px))
-        self.mesh = np.meshgrid(w, w)
+        self.axis = self.get_axis(patch_size_px)
 
         self.gauss = self.get_gauss_cutout()
 
@@ -104,64 +191,206 @@ class GaborGenerator(NoiseGenerator):
 
     def __update_values__(self, dt=1) -> None:
         for name, update_function in self.update_list:
-            self.__dict__[name] = update_function(dt)
+            value = update_function(dt)
 
-            self.__should_update_patch = True
-            self.__normalized_patch = None
+            # Updaters that return the same value (eg. `NoUpdater`) don't cause a new render
+            if self.__dict__[name] != value:
+                self.__dict__[name] = value
+                self.__should_update_patch = True
 
     def __update__(self, dt=1) -> None:
         self.__update_values__(dt)
 
         if self.__should_update_patch:
-            grating = self.get_grating()
-            gabor = grating * self.gauss
-            self.frame = gabor / gabor.max()
-
-            self.__normalized_patch = get_normalized(self.frame)
+            self.frame, self.__normalized_patch = self.__get_patches__()
             self.__should_update_patch = False
+        else:
+            # Same values, same patch - the frame version stays as well
+            self.changed = False
 
-    def get_grating(self) -> np.ndarray:
-        theta_rad = (self.theta / 360) * self.TWO_PI
-        freq_rad = self.freq * self.TWO_PI
-        phase_rad = self.phase * self.TWO_PI
+    def refresh_patch(self) -> None:
+        """Renders the patch again, eg. after the gauss cutout was changed."""
+        self.__should_update_patch = True
+        self.__update__(0)
+        self.frame_version += 1
+
+    def __get_patches__(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self.cache is None:
+            return self.__render_patches__()
+
+        quantised_values = self.cache.quantise(self.freq, self.theta, self.phase)
+        key = (*self.get_patch_key(), quantised_values)
+
+        patches = self.cache.get(key)
+        if patches is None:
+            values = self.freq, self.theta, self.phase
+            self.freq, self.theta, self.phase = self.cache.get_values(quantised_values)
+
+            patches = self.__render_patches__()
+            self.cache.put(key, patches)
+
+            self.freq, self.theta, self.phase = values
+
+        return patches
+
+    def get_patch_key(self) -> tuple:
+        """Returns the part of the cache key that identifies the kind of the patch (everything but the parameters)."""
+        return type(self).__name__, self.width, self.ppd
+
+    def __render_patches__(self) -> Tuple[np.ndarray, np.ndarray]:
+        gabor = self.get_patch()
+        frame = gabor / gabor.max()
+
+        return frame, get_normalized(frame)
+
+    def get_patch(self) -> np.ndarray:
+        """Returns the current patch before the normalization."""
+        return self.get_grating() * self.gauss
 
-        [mesh_w, mesh_h] = self.mesh
-        x_t = mesh_w * np.cos(theta_rad)
-        y_t = mesh_h * np.sin(theta_rad)
+    def get_grating_factors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns rank-2 factors of the grating - `(left, right)` such that `left @ right` is the grating."""
+        left, right = self.get_batch_grating_factors(self.axis, self.freq, self.theta, self.phase)
+        return left[0], right[0]
 
-        xyt = x_t + y_t
-        xyf = xyt * freq_rad
-        return np.sin(xyf + phase_rad)
+    def get_grating(self) -> np.ndarray:
+        left, right = self.get_grating_factors()
+        return left @ right
 
     def get_gauss_cutout(self) -> np.ndarray:
-        [mesh_w, mesh_h] = self.mesh
-        gauss = np.exp(((mesh_w ** 2) + (mesh_h ** 2)) / self.SIGMA)
+        return self.get_gauss(self.axis)
 
-        return np.clip(gauss, self.TRIM, gauss.max()) - self.TRIM
+    @classmethod
+    def get_axis(cls, patch_size_px: int) -> np.ndarray:
+        """Returns the centred axis of the patches of given size - same along the rows and the columns."""
+        fft = get_fft_backend()
+        return fft.fftshift(fft.fftfreq(patch_size_px))
 
+    @classmethod
+    def get_gauss(cls, axis: np.ndarray) -> np.ndarray:
+        """Returns the circular gauss cutout of the patches with given axis."""
+        # The gaussian is separable - exp(x^2 + y^2) is an outer product of exp(x^2) and exp(y^2)
+        gauss_1d = np.exp((axis ** 2) / cls.SIGMA)
+        gauss = np.outer(gauss_1d, gauss_1d)
 
-class PlaidGenerator(GaborGenerator):
-    """Generator used to generate plaid patches of given size
+        return np.clip(gauss, cls.TRIM, gauss.max()) - cls.TRIM
+
+    @classmethod
+    def get_batch_grating_factors(cls, axis: np.ndarray, freq, theta, phase) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns rank-2 factors of the gratings with given parameters - `(left, right)` of shapes `(k, N, 2)` and
+        `(k, 2, N)` such that `left @ right` is the `(k, N, N)` stack of the gratings.
+
+        The grating is `sin(a_i + b_j)` with `a_i` depending only on the row and `b_j` only on the column.
+        Thanks to `sin(a + b) = sin(a)cos(b) + cos(a)sin(b)` it is a sum of two outer products,
+        so only `O(N)` values of sin and cos are needed instead of `O(N^2)`.
+
+        Parameters
+        ----------
+        axis : ndarray
+            Axis of the patches (see `get_axis`).
+
+        freq, theta, phase : array_like
+            Frequencies, rotations (in degrees) and phase shifts of the k gratings.
+        """
+        freq, theta, phase = np.broadcast_arrays(*(np.atleast_1d(np.asarray(values, dtype=float))
+                                                   for values in (freq, theta, phase)))
+
+        theta_rad = (theta / 360) * cls.TWO_PI
+        freq_rad = freq * cls.TWO_PI
+        phase_rad = phase * cls.TWO_PI
+
+        # Shapes (k, N) - one row per grating, `a` changes along the rows and `b` along the columns
+        a = np.outer(np.sin(theta_rad) * freq_rad, axis) + phase_rad[:, np.newaxis]
+        b = np.outer(np.cos(theta_rad) * freq_rad, axis)
+
+        left = np.stack((np.sin(a), np.cos(a)), axis=-1)
+        right = np.stack((np.cos(b), np.sin(b)), axis=-2)
+
+        return left, right
+
+    @classmethod
+    def render_frames(cls, axis: np.ndarray, gauss: np.ndarray, freq, theta, phase) -> np.ndarray:
+        """ Renders the patches with given parameters (see `get_batch_grating_factors`) in one batched matrix
+        product. Returns the `(k, N, N)` stack of the frames - the same as the frames of `GaborGenerator`.
+        """
+        left, right = cls.get_batch_grating_factors(axis, freq, theta, phase)
+
+        frames = np.matmul(left, right)
+        frames *= gauss
+        frames /= frames.max(axis=(-2, -1), keepdims=True)
+
+        return frames
+
+
+class CompoundGratingGenerator(GaborGenerator):
+    """Generator used to generate patches of several gratings under one gauss cutout (eg. plaids)
+
+    Every component is defined relative to the base `freq`, `theta` and `phase` of the generator,
+    so the `update_list` updaters move the whole compound at once. All the components are rendered in one
+    rank-2K matrix product (see `get_grating_factors`) - there is no per component rendering over the mesh.
+
+    Parameters
+    ----------
+    theta_offsets : Iterable[float], optional
+        Rotation of the components relative to `theta` in degrees. Defaults to a single component (0,).
+
+    freq_factors : Iterable[float] or float, optional
+        Frequencies of the components relative to `freq`. Defaults to 1.
+
+    phase_offsets : Iterable[float] or float, optional
+        Phase shifts of the components relative to `phase`. Defaults to 0.
 
-      The patch can change in time if specified during class initialization.
+    amplitudes : Iterable[float] or float, optional
+        Weights of the components. Defaults to 1.
+
+    kwargs
+        Arguments of `GaborGenerator`.
     """
 
-    def __init__(self, **kwargs):
-        super(PlaidGenerator, self).__init__(**kwargs)
+    def __init__(self, theta_offsets=(0,), freq_factors=1., phase_offsets=0., amplitudes=1., **kwargs):
+        theta_offsets, freq_factors, phase_offsets, amplitudes = np.broadcast_arrays(
+            *(np.asarray(values, dtype=float) for values in (theta_offsets, freq_factors, phase_offsets, amplitudes)))
+        if theta_offsets.ndim != 1:
+            raise ValueError("The component parameters have to be scalars or one dimensional arrays")
 
-        self.gauss /= 2
-        # We need to recompute the patches once again because we changed the gauss cutout
-        self.__update__(0)
+        self.theta_offsets = theta_offsets
+        self.freq_factors = freq_factors
+        self.phase_offsets = phase_offsets
+        self.amplitudes = amplitudes
 
-    def __update__(self, dt=1) -> None:
-        self.__update_values__(dt)
+        super(CompoundGratingGenerator, self).__init__(**kwargs)
+
+    def get_patch_key(self) -> tuple:
+        components = tuple(map(tuple, (self.theta_offsets, self.freq_factors, self.phase_offsets, self.amplitudes)))
+        return (*super(CompoundGratingGenerator, self).get_patch_key(), components)
+
+    def get_compound_grating_factors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns rank-2K factors of the compound grating - `(left, right)` such that `left @ right` is the sum of
+        all the K components.
+        """
+        # Shapes (K, N, 2) and (K, 2, N) - one pair of factors per component
+        left, right = self.get_batch_grating_factors(self.axis, self.freq * self.freq_factors,
+                                                     self.theta + self.theta_offsets, self.phase + self.phase_offsets)
+
+        left = (left * self.amplitudes[:, np.newaxis, np.newaxis]).transpose(1, 0, 2).reshape(len(self.axis), -1)
+        right = right.reshape(-1, len(self.axis))
 
-        grating_a = self.get_grating()
-        self.theta += 90
-        grating_b = self.get_grating()
-        self.theta -= 90
+        return left, right
 
-        grating = grating_a + grating_b
-        gabor = grating * self.gauss
+    def get_grating(self) -> np.ndarray:
+        left, right = self.get_compound_grating_factors()
+        return left @ right
+
+
+class PlaidGenerator(CompoundGratingGenerator):
+    """Generator used to generate plaid patches of given size
+
+      The patch consists of two gratings 90 degrees apart. It can change in time if specified during class
+      initialization.
+    """
+
+    def __init__(self, **kwargs):
+        super(PlaidGenerator, self).__init__(theta_offsets=(0, 90), **kwargs)
 
-        self.frame = gabor / gabor.max()
+        self.gauss /= 2
+        # We need to recompute the patches once again because we changed the gauss cutout
+        self.refresh_patch()
@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
+
+from generators.noise_generator import NoiseGenerator
+
+
+class Clock:
+    """ Shared clock of a generator graph.
+
+    Attributes
+    ----------
+    tick : int
+        Number of ticks since the start.
+
+    dt : float
+        Time that has passed during the last tick.
+
+    time : float
+        Time since the start.
+    """
+
+    def __init__(self):
+        self.tick = 0
+        self.dt = 0
+        self.time = 0
+
+    def advance(self, dt=1):
+        self.tick += 1
+        self.dt = dt
+        self.time += dt
+
+
+def get_graph_levels(outputs: Iterable[NoiseGenerator]) -> List[List[NoiseGenerator]]:
+    """ Splits the graph of given generators (and all of their inputs) into topological levels.
+
+    Generators of one level depend only on generators of the previous levels, so they can be evaluated in parallel.
+    Every generator is present only once, even if it's an input of several other generators.
+    """
+    levels = {}
+
+    def get_level(node: NoiseGenerator) -> int:
+        if node not in levels:
+            levels[node] = 1 + max((get_level(node_input) for node_input in node.get_inputs()), default=-1)
+
+        return levels[node]
+
+    for output in outputs:
+        get_level(output)
+
+    graph_levels = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+    for node, level in levels.items():
+        graph_levels[level].append(node)
+
+    return graph_levels
+
+
+class GraphExecutor:
+    """ Advances a graph of `NoiseGenerator`s by one shared clock.
+
+    Every tick the generators are updated exactly once, inputs before the generators that read them.
+    The generators in the graph are bound to the clock of the executor - any `get_next_frame` call during the tick,
+    no matter the passed `dt`, returns the frame of the current tick. That way several outputs can read one
+    generator (eg. several heat maps over one scene) without advancing it several times.
+
+    The inputs are declared by `NoiseGenerator.get_inputs`. Static generators (eg. `PinkNoise` in
+    `ContinuousNoiseGenerator`) are not a part of the graph as they don't depend on time.
+
+    Parameters
+    ----------
+    outputs : Iterable[NoiseGenerator]
+        Generators whose frames are needed. All of their inputs are added to the graph as well.
+
+    workers : int, optional
+        Number of threads used to evaluate independent generators of one level. Defaults to 1 (no threads).
+
+    Methods
+    -------
+    tick(dt=1)
+        Advances the clock by `dt` and updates all the generators.
+
+    close()
+        Shuts the thread pool down and releases the generators from the clock.
+    """
+
+    def __init__(self, outputs: Iterable[NoiseGenerator], workers=1):
+        self.clock = Clock()
+        self.levels = get_graph_levels(outputs)
+
+        for level in self.levels:
+            for node in level:
+                node.clock = self.clock
+
+        self.pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    @staticmethod
+    def __evaluate__(node: NoiseGenerator):
+        node.__next_frame__()
+
+    def tick(self, dt=1):
+        self.clock.advance(dt)
+
+        for level in self.levels:
+            if self.pool is not None and len(level) > 1:
+                # `list` waits for the whole level and re-raises the exceptions of the workers
+                list(self.pool.map(self.__evaluate__, level))
+            else:
+                for node in level:
+                    self.__evaluate__(node)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+        for level in self.levels:
+            for node in level:
+                node.clock = None
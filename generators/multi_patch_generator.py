@@ -0,0 +1,135 @@
+from typing import Iterable, Tuple, Callable, List, Dict
+
+import numpy as np
+
+from generators.gabor_generator import GaborGenerator
+from generators.noise_generator import NoiseGenerator
+from utils.array import apply_patch
+
+
+class MultiPatchGenerator(NoiseGenerator):
+    """ `NoiseGenerator` that puts many gabor patches into one base noise image
+
+    Unlike `PatchedNoiseGenerator` there is no generator per patch. Parameters of all the patches are stored
+    in arrays (one element per patch) and they are updated by vectorised updaters - any `Updater` with an array
+    `initial_value` works. All the patches of the same size are rendered in one batched call into a
+    `(k, size, size)` stack (see `render_patches`), which is then blended into the base noise patch by patch.
+    The stacks are rendered again only if their parameters have changed.
+
+    The patches are the same as the ones of `GaborGenerator` with the same parameters
+    and they are blended in the given order.
+
+    Parameters
+    ----------
+    width : int
+        Width of the generated noise
+
+    height : int
+        Height of the generated noise
+
+    generator : NoiseGenerator
+        Generator used to generate the base noise image
+
+    x, y : array_like
+        Positions of the patches in the base image.
+
+    patch_size_deg : array_like
+        Patch sizes in degrees.
+
+    ppd : int, optional
+        Pixels per one degree. Defaults to 60.
+
+    freq, theta, phase : array_like, optional
+        Frequencies, rotations (in degrees) and phase shifts of the patches. See `GaborGenerator`.
+
+    contrast : array_like, optional
+        The weights with which the patches are applied into the image. Defaults to 0.5
+
+    update_list : Iterable[Tuple[str, Callable[[float], ndarray]]], optional
+        List of update pairs. First in pair is name of updated parameter array (`x`, `y`, `freq`, `theta`, `phase`
+        or `contrast`). Second in pair the function returning the new values of all the patches at once.
+        The function accepts only one float parameter denoting time that has passed from last update.
+
+    Attributes
+    ----------
+    count : int
+        Number of the patches.
+    """
+    PARAMETERS = ('x', 'y', 'freq', 'theta', 'phase', 'contrast')
+
+    def __init__(self, width: int, height: int, generator: NoiseGenerator, x, y, patch_size_deg, ppd=60,
+                 freq=6, theta=45, phase=0.25, contrast=0.5,
+                 update_list: Iterable[Tuple[str, Callable[[float], np.ndarray]]] = None):
+        super(MultiPatchGenerator, self).__init__(width, height)
+
+        self.background_generator = generator
+        self.update_list = update_list or []
+
+        sizes = (np.asarray(patch_size_deg, dtype=float) * ppd).astype(int)
+        self.count = np.broadcast(x, y, sizes, freq, theta, phase, contrast).size
+        self.sizes = np.broadcast_to(sizes, (self.count,))
+
+        self.x = self.y = self.freq = self.theta = self.phase = self.contrast = None
+        self.__set_values__(x=x, y=y, freq=freq, theta=theta, phase=phase, contrast=contrast)
+
+        # Indices of the patches grouped by their size
+        self.groups = {int(size): np.flatnonzero(self.sizes == size) for size in np.unique(self.sizes)}
+        # Position of every patch within the stack of its group
+        self.stack_indices = np.empty(self.count, dtype=int)
+        for indices in self.groups.values():
+            self.stack_indices[indices] = np.arange(len(indices))
+
+        self.axes = {size: GaborGenerator.get_axis(size) for size in self.groups}
+        self.gausses = {size: GaborGenerator.get_gauss(axis) for size, axis in self.axes.items()}
+
+        self.patches: Dict[int, np.ndarray] = {}
+        self.rendered_values: Dict[int, np.ndarray] = {}
+        self.frame_buffer = None
+
+    def __set_values__(self, **values) -> None:
+        for name, value in values.items():
+            if name not in self.PARAMETERS:
+                raise ValueError(f"The parameter {name} wasn't recognized. Try one of {list(self.PARAMETERS)} instead")
+
+            self.__dict__[name] = np.array(np.broadcast_to(value, (self.count,)), dtype=float)
+
+    def get_inputs(self) -> List[NoiseGenerator]:
+        return [self.background_generator]
+
+    def render_patches(self, indices: np.ndarray, size: int) -> np.ndarray:
+        """ Renders the patches with given indices (all of them of given size) into a `(k, size, size)` stack.
+
+        The whole stack is one batched matrix product - see `GaborGenerator.render_frames`.
+        """
+        return GaborGenerator.render_frames(self.axes[size], self.gausses[size],
+                                            self.freq[indices], self.theta[indices], self.phase[indices])
+
+    def __render__(self) -> None:
+        for size, indices in self.groups.items():
+            values = np.stack((self.freq[indices], self.theta[indices], self.phase[indices]))
+
+            if size not in self.patches or not np.array_equal(values, self.rendered_values[size]):
+                self.patches[size] = self.render_patches(indices, size)
+                self.rendered_values[size] = values
+
+    def __update__(self, dt=1) -> None:
+        for name, update_function in self.update_list:
+            self.__set_values__(**{name: update_function(dt)})
+
+        background_noise = self.background_generator.get_next_frame(dt)
+
+        # Same as `PatchedNoiseGenerator` - the background is clipped while it's copied into our own buffer
+        if self.frame_buffer is None or self.frame_buffer.shape != background_noise.shape:
+            self.frame_buffer = np.empty_like(background_noise)
+        background_noise = np.clip(background_noise, 0, 1, out=self.frame_buffer)
+
+        self.__render__()
+
+        xs = np.rint(self.x).astype('int')
+        ys = np.rint(self.y).astype('int')
+        # Blended in the given order, so the overlapping patches look the same as in `PatchedNoiseGenerator`
+        for i in range(self.count):
+            patch = self.patches[self.sizes[i]][self.stack_indices[i]]
+            apply_patch(background_noise, patch, xs[i], ys[i], contrast=self.contrast[i])
+
+        self.frame = background_noise
@@ -0,0 +1,131 @@
+from os.path import join
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from generators.noise_generator import StaticNoiseGenerator
+from generators.pink_noise_generator import PinkNoise
+from utils.rng import Seed, get_rng
+
+
+def get_noise_bank_file_name(width: int, height: int, seed=None, folder='') -> str:
+    seed_suffix = f'_{seed}' if seed is not None else ''
+    return join(folder, f'pink_noise_bank_{width}x{height}{seed_suffix}.npy')
+
+
+def render_frames(out: np.ndarray, generator: StaticNoiseGenerator, batch_size=16) -> np.ndarray:
+    """ Fills the `(frames, width, height)` array `out` with next frames of given generator.
+
+    If the generator offers `get_frames(n)` the frames are rendered in batches of `batch_size`.
+    """
+    get_frames = getattr(generator, 'get_frames', None)
+    for start in range(0, len(out), batch_size):
+        end = min(start + batch_size, len(out))
+
+        if get_frames is not None:
+            out[start:end] = get_frames(end - start)
+        else:
+            for i in range(start, end):
+                out[i] = generator.get_next_frame()
+
+    return out
+
+
+def render_noise_bank(file_name: str, generator: StaticNoiseGenerator, frames: int, dtype=np.float32,
+                      batch_size=16) -> str:
+    """ Pre-renders `frames` frames of given generator into a `.npy` file.
+
+    The frames are written through a memory map, so the whole bank never has to fit into the memory.
+    If the generator offers `get_frames(n)` the frames are rendered in batches of `batch_size`.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the output `.npy` file.
+
+    generator : StaticNoiseGenerator
+        Generator used to render the frames.
+
+    frames : int
+        Number of frames in the bank.
+
+    dtype : numpy dtype, optional
+        Type in which the frames are stored. Defaults to `np.float32`.
+
+    batch_size : int, optional
+        Number of frames rendered at once.
+
+    Returns
+    -------
+    Name of the created file.
+    """
+    bank = open_memmap(file_name, mode='w+', dtype=dtype, shape=(frames, generator.width, generator.height))
+
+    render_frames(bank, generator, batch_size)
+
+    bank.flush()
+    del bank
+
+    return file_name
+
+
+def render_pink_noise_bank(width: int, height: int, frames: int, seed: int = None, folder='', file_name=None,
+                           dtype=np.float32, batch_size=16) -> str:
+    file_name = file_name or get_noise_bank_file_name(width, height, seed, folder)
+    generator = PinkNoise(width, height, dtype=dtype, seed=seed)
+
+    return render_noise_bank(file_name, generator, frames, dtype=dtype, batch_size=batch_size)
+
+
+class NoiseBankGenerator(StaticNoiseGenerator):
+    """ `StaticNoiseGenerator` that serves frames from a pre-rendered noise bank.
+
+    The bank is a `.npy` file of shape `(frames, width, height)` - see `render_noise_bank`.
+    It is memory-mapped, so getting a frame is only a page-in of the data instead of the full synthesis.
+    Returned frames are read-only views into the bank.
+
+    Width and Height of the noise is derived from the bank file.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the `.npy` bank file.
+
+    random_order : bool, optional
+        If set the frames are picked at random (never the same frame twice in a row).
+        Otherwise the frames are served in sequence and the sequence starts over at its end. Defaults to True.
+
+    seed : None, int, SeedSequence or Generator, optional
+        Seed used to pick the frames in random order.
+
+    Methods
+    -------
+    get_next_frame()
+        Gets next frame.
+    """
+
+    def __init__(self, file_name: str, random_order=True, seed: Seed = None):
+        self.bank = np.load(file_name, mmap_mode='r')
+
+        frames, width, height = self.bank.shape
+        super(NoiseBankGenerator, self).__init__(width, height)
+
+        self.frames = frames
+        self.random_order = random_order
+        self.rng = get_rng(seed)
+        self.index = -1
+
+    def __next_index__(self) -> int:
+        if not self.random_order:
+            return (self.index + 1) % self.frames
+
+        if self.frames == 1 or self.index < 0:
+            return int(self.rng.integers(self.frames))
+
+        # Picking from all the frames but the last one guarantees that two consecutive frames differ
+        index = int(self.rng.integers(self.frames - 1))
+        return index + 1 if index >= self.index else index
+
+    def get_next_frame(self) -> np.ndarray:
+        self.index = self.__next_index__()
+        return self.bank[self.index]
@@ -1,3 +1,5 @@
+from typing import List
+
 from numpy import ndarray
 
 
@@ -27,19 +29,46 @@ class NoiseGenerator:
     frame : ndarray
         The last frame that has been generated
 
+    frame_version : int
+        Number of changes of `frame`. Two frames with the same version are the same frame, so the consumers can skip
+        the work they have already done for it. Generators whose update left the frame as it was set `changed`
+        to False in `__update__` and the version stays the same.
+
+    constant_value : float or None
+        Value of all the pixels of the frame if the frame is known to be constant, None otherwise.
+
+    zero_copy : bool
+        Opt-in switch of the zero-copy protocol. If set `get_next_frame` returns a read-only view of `frame` instead
+        of a copy. The view is valid only until the next update of the generator (see `frame_version`),
+        so it must not be kept past the current tick. Defaults to False.
+
     Methods
     -------
     get_next_frame(dt=1)
         Gets next frame. `dt` denotes the time that has passed between two consecutive generations.
 
-        Should always returns a copy of `frame` to prevent unwanted modifications.
+        Returns a copy of `frame` to prevent unwanted modifications, or a read-only view if `zero_copy` is set.
+
+    get_next_frame_mut(dt=1)
+        Same as `get_next_frame`, but always returns a private writable copy of the frame.
+
+    get_inputs()
+        Returns the `NoiseGenerator`s this generator reads its frames from - see `GraphExecutor`.
     """
+    zero_copy = False
+    constant_value = None
+    changed = True
+
+    # Set by `GraphExecutor` - the generator is then updated exactly once per tick of the clock
+    clock = None
+    evaluated_tick = -1
 
     def __init__(self, width: int, height: int):
         self.width = width
         self.height = height
 
         self.frame = None
+        self.frame_version = 0
 
     def __update__(self, dt=1) -> None:
         """Updates inner variables.
@@ -54,11 +83,42 @@ class NoiseGenerator:
         """
         pass
 
-    def get_next_frame(self, dt=1) -> ndarray:
+    def get_inputs(self) -> List['NoiseGenerator']:
+        return []
+
+    def __next_frame__(self, dt=1) -> ndarray:
+        if self.clock is not None:
+            # Driven by the shared clock, the time passed by the caller is ignored
+            if self.evaluated_tick != self.clock.tick:
+                self.__tracked_update__(self.clock.dt)
+                self.evaluated_tick = self.clock.tick
+
+            return self.frame
+
         if dt > 0 or self.frame is None:
-            self.__update__(dt)
+            self.__tracked_update__(dt)
+
+        return self.frame
+
+    def __tracked_update__(self, dt=1) -> None:
+        self.changed = True
+        self.__update__(dt)
+
+        if self.changed:
+            self.frame_version += 1
+
+    def get_next_frame(self, dt=1) -> ndarray:
+        frame = self.__next_frame__(dt)
+
+        if not self.zero_copy:
+            return frame.copy()
+
+        view = frame.view()
+        view.flags.writeable = False
+        return view
 
-        return self.frame.copy()
+    def get_next_frame_mut(self, dt=1) -> ndarray:
+        return self.__next_frame__(dt).copy()
 
 
 class StaticNoiseGenerator:
@@ -1,4 +1,4 @@
-from typing import Callable, Tuple, Iterable
+from typing import Callable, Tuple, Iterable, List
 
 import numpy as np
 
@@ -58,18 +58,42 @@ class PatchedNoiseGenerator(NoiseGenerator):
         super(PatchedNoiseGenerator, self).__init__(width, height)
 
         self.contrast = contrast
+        self.frame_buffer = None
+        # Versions of the inputs and positions of the patches the current frame was composed from
+        self.composed_state = None
+
+    def get_inputs(self) -> List[NoiseGenerator]:
+        return [self.background_generator, *(patch_generator for patch_generator, _ in self.patch_generators)]
 
     def __update__(self, dt=1) -> None:
         background_noise = self.background_generator.get_next_frame(dt)
 
+        patches = []
         for patch_generator, position_generator in self.patch_generators:
             patch = patch_generator.get_next_frame(dt)
             x, y = np.rint(position_generator(dt)).astype('int')
-
+            patches.append((patch, x, y))
+
+        # Nothing has moved and no input has changed (eg. static background with a static patch),
+        # so the last composition is still valid
+        state = (self.background_generator.frame_version,
+                 tuple((patch_generator.frame_version, x, y)
+                       for (patch_generator, _), (_, x, y) in zip(self.patch_generators, patches)))
+        if self.frame is not None and state == self.composed_state:
+            self.changed = False
+            return
+        self.composed_state = state
+
+        # The background may be a read-only view (zero-copy protocol), so the patches go into our own buffer.
+        # We do not want to normalize, because that could alter values that shouldn't be affected by the patch
+        # (eg edges). So instead we just clip values that are way too high or low - in the same pass as the copy.
+        # The patches clip only the regions they touch.
+        if self.frame_buffer is None or self.frame_buffer.shape != background_noise.shape:
+            self.frame_buffer = np.empty_like(background_noise)
+        background_noise = np.clip(background_noise, 0, 1, out=self.frame_buffer)
+
+        for patch, x, y in patches:
             # apply_patch(background_noise, patch, x, y, overwrite=True)
             apply_patch(background_noise, patch, x, y, contrast=self.contrast)
 
-        # We do not want to normalize,
-        # because that could alter values that shouldn't be affected by the patch (eg edges)
-        # So instead we just clip values that are way too high or low.
-        self.frame = np.clip(background_noise, 0, 1)
+        self.frame = background_noise
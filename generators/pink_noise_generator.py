@@ -1,14 +1,17 @@
 import numpy as np
-from numpy import fft
 
 from generators.noise_generator import StaticNoiseGenerator
-from generators.white_noise_generator import WhiteNoise
-from utils.array import normalize
+from utils.fft_backend import get_fft_backend, get_frequency_mesh
+from utils.rng import Seed, get_seed_sequence, get_frame_rng
 
 
 class PinkNoise(StaticNoiseGenerator):
     """ `StaticNoiseGenerator` that generates pink noise images
 
+    The noise is synthesised directly in the frequency domain. A random complex spectrum is written into the
+    real-FFT (`rfft2`) layout, shaped by the 1/f filter and transformed back with a single `irfft2`.
+    That way there is no forward transform of a white noise image and no shifting of the spectra.
+
     Parameters
     ----------
     width : int
@@ -17,19 +20,35 @@ class PinkNoise(StaticNoiseGenerator):
     height : int
         Height of the generated noise
 
+    dtype : numpy dtype, optional
+        Floating point type of the generated frames. Either `np.float64` (default) or `np.float32`.
+
+    seed : None, int, SeedSequence or Generator, optional
+        Seed of the noise. Every frame is drawn from its own stream derived from the seed and the frame index,
+        so the `k`-th frame is always the same no matter how the frames were batched or which worker made it.
+
+    Methods
+    -------
+    get_next_frame()
+        Gets next frame.
+
+    get_frames(n)
+        Gets a `(n, width, height)` stack of next `n` frames computed with one batched transform.
+
+    get_frame(index)
+        Gets the `index`-th frame of the sequence without moving the sequence on.
     """
 
-    def __init__(self, width, height):
-        self.whiteNoise = WhiteNoise(width, height)
+    def __init__(self, width, height, dtype=np.float64, seed: Seed = None):
         super(PinkNoise, self).__init__(width, height)
 
-        w = fft.fftshift(fft.fftfreq(self.width))
-        # w = w / degrees
-
-        h = fft.fftshift(fft.fftfreq(self.height))
-        # h = h / degrees
+        self.dtype = np.dtype(dtype)
+        self.complex_dtype = np.result_type(self.dtype, np.complex64)
+        self.seed_sequence = get_seed_sequence(seed)
+        self.index = 0
 
-        [mesh_w, mesh_h] = np.meshgrid(h, w)
+        # The last axis holds only the non-negative frequencies as that's the layout of `rfft2`
+        mesh_w, mesh_h = get_frequency_mesh((self.width, self.height), real=True)
         omega = np.sqrt(mesh_w ** 2 + mesh_h ** 2)
 
         # This part deals with zero frequencies. There is only one present
@@ -37,21 +56,47 @@ class PinkNoise(StaticNoiseGenerator):
         zero_freq = omega == 0
         omega[zero_freq] = omega[~zero_freq].min()
 
-        self.browner = 1 / omega
+        self.browner = (1 / omega).astype(self.dtype)
 
-        # inf_browner = np.isposinf(self.browner)
-        # self.browner[inf_browner] = self.browner[~inf_browner].max()
+    def get_spectra(self, indices) -> np.ndarray:
+        """Returns random spectra of frames with given indices already shaped by the 1/f filter.
 
-    def get_next_frame(self) -> np.ndarray:
-        base_noise = self.whiteNoise.get_next_frame()
-        fft_noise = fft.fftshift(fft.fft2(base_noise))
+        Real and imaginary parts are drawn as independent gaussian white noise,
+        which is what the Fourier transform of a white noise image converges to.
+        """
+        spectra = np.empty((len(indices), *self.browner.shape, 2), dtype=self.dtype)
+        for spectrum, index in zip(spectra, indices):
+            get_frame_rng(self.seed_sequence, index).standard_normal(out=spectrum, dtype=self.dtype)
+
+        spectra = spectra.view(self.complex_dtype)[..., 0]
 
-        brown_noise = fft_noise * self.browner
-        unclipped_noise = fft.ifft2(fft.ifftshift(brown_noise))
+        spectra *= self.browner
+        return spectra
 
-        std_un = np.std(unclipped_noise)
-        clipped_noise = np.clip(unclipped_noise, -2 * std_un, 2 * std_un)
-        clipped_noise = np.real(clipped_noise)
+    def __render__(self, indices) -> np.ndarray:
+        frames = get_fft_backend().irfft2(self.get_spectra(indices), s=(self.width, self.height))
+        frames = frames.astype(self.dtype, copy=False)
 
-        normalize(clipped_noise)
-        return clipped_noise
+        axes = (-2, -1)
+        std_un = np.std(frames, axis=axes, keepdims=True)
+        np.clip(frames, -2 * std_un, 2 * std_un, out=frames)
+
+        # Every frame is normalized on its own, same as `normalize` would do for a single frame
+        min_value = np.min(frames, axis=axes, keepdims=True)
+        max_value = np.max(frames, axis=axes, keepdims=True)
+        frames -= min_value
+        frames /= max_value - min_value
+
+        return frames
+
+    def get_frames(self, n=1) -> np.ndarray:
+        frames = self.__render__(range(self.index, self.index + n))
+        self.index += n
+
+        return frames
+
+    def get_frame(self, index: int) -> np.ndarray:
+        return self.__render__([index])[0]
+
+    def get_next_frame(self) -> np.ndarray:
+        return self.get_frames(1)[0]
@@ -0,0 +1,99 @@
+from queue import Queue, Empty, Full
+from threading import Thread, Event
+
+from numpy import ndarray
+
+from generators.noise_generator import StaticNoiseGenerator
+
+
+class PrefetchingGenerator(StaticNoiseGenerator):
+    """ `StaticNoiseGenerator` that wraps another `StaticNoiseGenerator` and renders its frames in advance.
+
+    A background thread keeps a bounded queue of ready frames filled. Getting a frame is then only a pop from the queue
+    and the synthesis (eg. the FFT of `PinkNoise`, which releases the GIL) runs outside of the render loop.
+    If the queue is empty when a frame is requested, the caller waits for the thread and the wait is counted as a stall.
+
+    Width and Height of the noise is derived from the wrapped generator.
+
+    Parameters
+    ----------
+    generator : StaticNoiseGenerator
+        The wrapped generator. It must not be used by anyone else once it's wrapped.
+
+    queue_size : int, optional
+        Maximal number of frames rendered in advance. Defaults to 4.
+
+    Attributes
+    ----------
+    queue_depth : int
+        Number of frames that are ready right now.
+
+    stalls : int
+        Number of requests that had to wait for the frame to be rendered.
+
+    Methods
+    -------
+    get_next_frame()
+        Gets next frame.
+
+    close()
+        Stops the background thread. Frames that are already in the queue can still be taken.
+    """
+
+    def __init__(self, generator: StaticNoiseGenerator, queue_size=4):
+        super(PrefetchingGenerator, self).__init__(generator.width, generator.height)
+
+        if queue_size < 1:
+            raise ValueError(f"The queue size has to be at least 1, {queue_size} given")
+
+        self.generator = generator
+        self.queue = Queue(maxsize=queue_size)
+        self.stalls = 0
+
+        self.error = None
+        self.stopped = Event()
+        self.thread = Thread(target=self.__prefetch__, name=f'{type(generator).__name__}-prefetch', daemon=True)
+        self.thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def __prefetch__(self):
+        try:
+            while not self.stopped.is_set():
+                frame = self.generator.get_next_frame()
+
+                while not self.stopped.is_set():
+                    try:
+                        # The timeout lets the thread notice `close` while the queue is full
+                        self.queue.put(frame, timeout=0.1)
+                        break
+                    except Full:
+                        pass
+        except Exception as e:
+            self.error = e
+            self.stopped.set()
+
+    def get_next_frame(self) -> ndarray:
+        try:
+            return self.queue.get_nowait()
+        except Empty:
+            pass
+
+        self.stalls += 1
+        while True:
+            try:
+                return self.queue.get(timeout=0.1)
+            except Empty:
+                pass
+
+            if self.error is not None:
+                raise RuntimeError("The prefetching of noise frames failed") from self.error
+
+            if self.stopped.is_set():
+                raise RuntimeError("The prefetching generator has been closed")
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
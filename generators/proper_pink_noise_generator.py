@@ -1,8 +1,9 @@
 import numpy as np
-from numpy import fft
 
 from generators.noise_generator import NoiseGenerator
 from utils.array import normalize
+from utils.fft_backend import get_fft_backend
+from utils.rng import Seed, get_seed_sequence, get_frame_rng
 
 
 class PinkNoise(NoiseGenerator):
@@ -16,14 +17,21 @@ class PinkNoise(NoiseGenerator):
     height : int
         Height of the generated noise
 
+    seed : None, int, SeedSequence or Generator, optional
+        Seed of the noise.
+
     """
 
-    def __init__(self, width, height, length=5, fps=30, deg=1 / 100):
+    def __init__(self, width, height, length=5, fps=30, deg=1 / 100, seed: Seed = None):
         super(PinkNoise, self).__init__(width, height)
 
+        self.seed_sequence = get_seed_sequence(seed)
+        self.volume_index = 0
+
         self.length = length
         self.frames_count = fps * length
 
+        fft = get_fft_backend()
         w = fft.fftshift(fft.fftfreq(self.width))
         # w = w / degrees
 
@@ -49,7 +57,12 @@ class PinkNoise(NoiseGenerator):
         self.currentTime = 0
 
     def __set_new_goal__(self):
-        base_noise = (np.random.rand(*self.browner.shape) * 2) - 1
+        rng = get_frame_rng(self.seed_sequence, self.volume_index)
+        self.volume_index += 1
+
+        base_noise = (rng.random(self.browner.shape) * 2) - 1
+
+        fft = get_fft_backend()
         fft_noise = fft.fftshift(fft.fftn(base_noise))
 
         brown_noise = fft_noise * self.browner
@@ -68,4 +81,144 @@ class PinkNoise(NoiseGenerator):
 
         i = int((self.currentTime / self.length) * self.frames_count)
 
-        self.frame = self.noise[:, :, i]
+        # The synthesised volume is periodic in time, so it can be looped instead of running out of frames
+        self.frame = self.noise[:, :, i % self.frames_count]
+
+
+class StreamingPinkNoise(NoiseGenerator):
+    """ `NoiseGenerator` that generates pink noise in time of unbounded length in bounded memory
+
+    The 1/f noise volume is synthesised in temporal blocks of `block_frames` frames.
+    Consecutive blocks overlap by `overlap_frames` frames and are crossfaded there (overlap-add with equal power
+    weights), so there is no visible seam between them. Only two blocks are held in memory at any time,
+    so the memory stays fixed no matter how long the noise runs.
+
+    Every block is standardized on its own and all the frames are mapped into [0, 1] with the same transformation
+    (clipped at two standard deviations), so the contrast is consistent across blocks.
+
+    Parameters
+    ----------
+    width : int
+        Width of the generated noise
+
+    height : int
+        Height of the generated noise
+
+    fps : int, optional
+        Frames per second. Defaults to 30.
+
+    deg : float, optional
+        Scaling of the temporal frequencies, same as in `PinkNoise`. Defaults to 1/100.
+
+    block_frames : int, optional
+        Number of frames in one block. If not set it's derived from `memory_budget`.
+
+    overlap_frames : int, optional
+        Number of frames two consecutive blocks are crossfaded over. Defaults to quarter of `block_frames`.
+
+    memory_budget : int, optional
+        Approximate number of bytes the blocks (including the spectrum of the synthesised block) may take.
+        Defaults to 512 MiB.
+
+    dtype : numpy dtype, optional
+        Floating point type of the generated frames. Defaults to `np.float32`.
+
+    seed : None, int, SeedSequence or Generator, optional
+        Seed of the noise. Every block is drawn from its own stream, so any block can be re-synthesised on its own.
+    """
+
+    def __init__(self, width, height, fps=30, deg=1 / 100, block_frames: int = None, overlap_frames: int = None,
+                 memory_budget=512 * 2 ** 20, dtype=np.float32, seed: Seed = None):
+        super(StreamingPinkNoise, self).__init__(width, height)
+
+        self.fps = fps
+        self.deg = deg
+        self.dtype = np.dtype(dtype)
+        self.seed_sequence = get_seed_sequence(seed)
+
+        if block_frames is None:
+            # Two blocks are kept in memory plus the spectrum (roughly twice a block) when a new block is synthesised
+            frame_bytes = self.width * self.height * self.dtype.itemsize
+            block_frames = int(memory_budget // (4 * frame_bytes))
+
+        self.block_frames = block_frames
+        self.overlap_frames = overlap_frames if overlap_frames is not None else self.block_frames // 4
+        self.hop_frames = self.block_frames - self.overlap_frames
+
+        if self.overlap_frames < 1 or self.hop_frames < self.overlap_frames:
+            raise ValueError(f'Blocks of {self.block_frames} frames cannot be crossfaded over {self.overlap_frames} '
+                             f'frames. Increase the memory budget or the block length.')
+
+        fft = get_fft_backend()
+        t = fft.fftfreq(self.block_frames) / deg
+        w = fft.fftfreq(self.width)
+        h = fft.rfftfreq(self.height)
+
+        # Frames are stacked along the first axis and the last axis holds the `rfftn` half of the spectrum.
+        # The 1/f filter is applied one temporal frequency at a time, so it never takes the memory of a whole block.
+        [mesh_w, mesh_h] = np.meshgrid(w, h, indexing='ij')
+        self.spatial_omega = (mesh_w ** 2 + mesh_h ** 2).astype(self.dtype)
+        self.temporal_omega = (t ** 2).astype(self.dtype)
+        self.spectrum_shape = (self.block_frames, *self.spatial_omega.shape)
+
+        fade = (np.arange(self.overlap_frames) + 0.5) / self.overlap_frames * (np.pi / 2)
+        self.fade_out = np.cos(fade).astype(self.dtype)
+        self.fade_in = np.sin(fade).astype(self.dtype)
+
+        self.blocks = {}
+        self.frame = np.empty((self.width, self.height), dtype=self.dtype)
+        self.currentTime = 0
+        self.__set_frame__(0)
+
+    def __synthesise_block__(self, index: int) -> np.ndarray:
+        rng = get_frame_rng(self.seed_sequence, index)
+        spectrum = rng.standard_normal((*self.spectrum_shape, 2), dtype=self.dtype)
+        spectrum = spectrum.view(np.result_type(self.dtype, np.complex64))[..., 0]
+
+        for temporal_omega, temporal_spectrum in zip(self.temporal_omega, spectrum):
+            browner = np.sqrt(self.spatial_omega + temporal_omega)
+            np.reciprocal(browner, out=browner, where=browner > 0)
+            temporal_spectrum *= browner
+
+        # The mean of every block is dropped, otherwise the crossfades would pump the overall luminance
+        spectrum[0, 0, 0] = 0
+
+        block = get_fft_backend().irfftn(spectrum, s=(self.block_frames, self.width, self.height))
+        del spectrum
+
+        block = block.astype(self.dtype, copy=False)
+        block /= np.std(block)
+
+        return block
+
+    def __get_block__(self, index: int) -> np.ndarray:
+        if index not in self.blocks:
+            # Only the requested block and its predecessor are ever needed
+            for old_index in [i for i in self.blocks if i not in (index - 1, index + 1)]:
+                self.blocks.pop(old_index)
+
+            self.blocks[index] = self.__synthesise_block__(index)
+
+        return self.blocks[index]
+
+    def __set_frame__(self, i: int) -> None:
+        block_index, local = divmod(i, self.hop_frames)
+        block = self.__get_block__(block_index)
+
+        if local < self.overlap_frames and block_index > 0:
+            previous_block = self.__get_block__(block_index - 1)
+
+            np.multiply(previous_block[local + self.hop_frames], self.fade_out[local], out=self.frame)
+            self.frame += self.fade_in[local] * block[local]
+        else:
+            self.frame[:] = block[local]
+
+        np.clip(self.frame, -2, 2, out=self.frame)
+        self.frame += 2
+        self.frame /= 4
+
+    def __update__(self, dt=1) -> None:
+        self.currentTime += dt
+
+        # The small epsilon keeps accumulated `dt` rounding errors from showing one frame twice
+        self.__set_frame__(int(self.currentTime * self.fps + 1e-6))
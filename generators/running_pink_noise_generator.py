@@ -1,13 +1,24 @@
 import numpy as np
-from numpy import fft
 
 from generators.noise_generator import NoiseGenerator
 from generators.white_noise_generator import WhiteNoise
 from utils.array import normalize
+from utils.fft_backend import get_fft_backend, get_frequency_mesh
+from utils.rng import Seed
 
 
 class RunningPinkNoise(NoiseGenerator):
-    """ `StaticNoiseGenerator` that generates pink noise images
+    """ `NoiseGenerator` that generates pink noise scrolling along the width
+
+    By default every frame is a pink noise filtered from a window of scrolling white noise.
+    That costs a forward and an inverse FFT of the window every frame.
+
+    With `strip_filtering` the white noise is filtered in strips instead. The filter is linear,
+    so a strip filtered once can be scrolled through by plain slicing. Each strip segment is filtered together
+    with both of its neighbours (and only the middle is kept), so consecutive segments join without a seam.
+    There is one strip-sized FFT per `period` and no FFT in between. All strips are mapped into [0, 1]
+    with the same transformation derived from the expected deviation of the filtered noise,
+    so the contrast is consistent across the whole strip.
 
     Parameters
     ----------
@@ -17,14 +28,24 @@ class RunningPinkNoise(NoiseGenerator):
     height : int
         Height of the generated noise
 
+    period : float
+        Time in which the noise scrolls by one window.
+
+    seed : None, int, SeedSequence or Generator, optional
+        Seed of the underlying white noise.
+
+    strip_filtering : bool, optional
+        Filter the noise once per `period` and slice the frames out of it. Defaults to False.
+
     """
 
-    def __init__(self, width, height, period):
+    def __init__(self, width, height, period, seed: Seed = None, strip_filtering=False):
         super(RunningPinkNoise, self).__init__(width, height)
 
         self.offset_width = width // 20
-        self.whiteNoise = WhiteNoise(width + self.offset_width * 2, height)
+        self.whiteNoise = WhiteNoise(width + self.offset_width * 2, height, seed=seed)
 
+        fft = get_fft_backend()
         w = fft.fftshift(fft.fftfreq(self.width + self.offset_width * 2))
         # w = w / degrees
 
@@ -43,13 +64,66 @@ class RunningPinkNoise(NoiseGenerator):
         self.currentTime = 0.0
         self.period = period
 
-        self.base_noise = np.concatenate((self.whiteNoise.get_next_frame(), self.whiteNoise.get_next_frame()))
+        self.strip_filtering = strip_filtering
+        if self.strip_filtering:
+            self.__init_strip__()
+        else:
+            self.base_noise = np.concatenate((self.whiteNoise.get_next_frame(), self.whiteNoise.get_next_frame()))
+
+    def __init_strip__(self):
+        segment_width = self.width + self.offset_width * 2
+
+        # The strip consists of three segments - the filtered one in the middle and its neighbours
+        mesh_w, mesh_h = get_frequency_mesh((segment_width * 3, self.height), real=True)
+        omega = np.sqrt(mesh_w ** 2 + mesh_h ** 2)
+        zero_freq = omega == 0
+        omega[zero_freq] = omega[~zero_freq].min()
+        self.strip_browner = 1 / omega
+
+        # By Parseval's theorem the variance of the filtered white noise is the variance of the white noise
+        # (1/3 for the uniform distribution on [-1, 1]) times the mean power of the filter over the full spectrum.
+        # The `rfft2` layout holds all the columns except for the mirrored ones.
+        mirrored = self.strip_browner[:, 1:(self.height + 1) // 2]
+        strip_power = (np.sum(self.strip_browner ** 2) + np.sum(mirrored ** 2)) / (segment_width * 3 * self.height)
+        self.strip_std = np.sqrt(strip_power / 3)
+
+        self.white_segments = [self.whiteNoise.get_next_frame() for _ in range(3)]
+        self.filtered_noise = np.empty((segment_width * 2, self.height))
+        self.filtered_noise[segment_width:] = self.__filter_segment__()
+
+        self.__set_new_strip_goal__()
+        self.currentTime += self.period
+
+    def __filter_segment__(self) -> np.ndarray:
+        segment_width = self.width + self.offset_width * 2
+        fft = get_fft_backend()
+
+        fft_noise = fft.rfft2(np.concatenate(self.white_segments))
+        fft_noise *= self.strip_browner
+        filtered_noise = fft.irfft2(fft_noise, s=(segment_width * 3, self.height))[segment_width:segment_width * 2]
+
+        std_un = self.strip_std
+        np.clip(filtered_noise, -2 * std_un, 2 * std_un, out=filtered_noise)
+        normalize(filtered_noise, -2 * std_un, 2 * std_un)
+
+        return filtered_noise
+
+    def __set_new_strip_goal__(self):
+        segment_width = self.width + self.offset_width * 2
+
+        # The buffer of the oldest segment is reused for the new one
+        oldest_segment = self.white_segments[0]
+        self.white_segments = self.white_segments[1:] + [self.whiteNoise.get_next_frame(out=oldest_segment)]
+
+        self.filtered_noise[:segment_width] = self.filtered_noise[segment_width:]
+        self.filtered_noise[segment_width:] = self.__filter_segment__()
+
+        self.currentTime -= self.period
 
     def __set_new_goal__(self):
         self.base_noise[0:self.width + self.offset_width * 2, 0:] = \
             self.base_noise[self.width + self.offset_width * 2:, 0:]
-        self.base_noise[self.width + self.offset_width * 2:, 0:] = \
-            self.whiteNoise.get_next_frame()
+        self.whiteNoise.get_next_frame(out=self.base_noise[self.width + self.offset_width * 2:, 0:])
 
         self.currentTime -= self.period
 
@@ -57,11 +131,17 @@ class RunningPinkNoise(NoiseGenerator):
         self.currentTime += dt
 
         while self.currentTime >= self.period:
-            self.__set_new_goal__()
+            self.__set_new_strip_goal__() if self.strip_filtering else self.__set_new_goal__()
 
         i = int((self.currentTime / self.period) * (self.width + self.offset_width * 2))
 
+        if self.strip_filtering:
+            self.frame = self.filtered_noise[i + self.offset_width:i + self.offset_width + self.width]
+            return
+
         base_noise = self.base_noise[i:i + self.width + self.offset_width * 2, 0:]
+
+        fft = get_fft_backend()
         fft_noise = fft.fftshift(fft.fft2(base_noise))
 
         brown_noise = fft_noise * self.browner
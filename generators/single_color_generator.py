@@ -1,4 +1,5 @@
-from numpy import ones, ndarray
+import numpy as np
+from numpy import ndarray
 
 from generators.noise_generator import StaticNoiseGenerator
 
@@ -6,6 +7,8 @@ from generators.noise_generator import StaticNoiseGenerator
 class SingleColor(StaticNoiseGenerator):
     """ `StaticNoiseGenerator` that generates single color noise.
 
+    The frames are read-only broadcast views of the color, so they take no memory and need no copying.
+
     Parameters
     ----------
     width : int
@@ -17,11 +20,16 @@ class SingleColor(StaticNoiseGenerator):
     color:float
         The color the noise will have. It's automatically clipped to be within range [0,1].
 
+    Attributes
+    ----------
+    constant_value : float
+        The color of the noise.
     """
 
     def __init__(self, width, height, color=1):
         super(SingleColor, self).__init__(width, height)
-        self.arr = ones((self.width, self.height)) * min(max(color, 0), 1)
+        self.constant_value = float(min(max(color, 0), 1))
+        self.arr = np.broadcast_to(np.float64(self.constant_value), (self.width, self.height))
 
     def get_next_frame(self) -> ndarray:
-        return self.arr.copy()
+        return self.arr
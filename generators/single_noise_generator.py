@@ -1,5 +1,6 @@
 from generators.noise_generator import NoiseGenerator, StaticNoiseGenerator
 from generators.pink_noise_generator import PinkNoise
+from utils.rng import Seed
 
 
 class SingleNoiseGenerator(NoiseGenerator):
@@ -18,6 +19,9 @@ class SingleNoiseGenerator(NoiseGenerator):
         The base StaticNoiseGenerator that is used to generate the list of defined frames.
         If not set the generator defaults to `PinkNoise`
 
+    seed : None, int, SeedSequence or Generator, optional
+        Seed of the default `PinkNoise` generator. Ignored if `generator` is set.
+
     Attributes
     ----------
     width : int
@@ -25,11 +29,20 @@ class SingleNoiseGenerator(NoiseGenerator):
 
     height : int
         Height of the generated noise
+
+    constant_value : float or None
+        Value of all the pixels if the noise is a single color (see `SingleColor`), None otherwise.
     """
 
-    def __init__(self, width: int, height: int, generator: StaticNoiseGenerator = None):
+    def __init__(self, width: int, height: int, generator: StaticNoiseGenerator = None, seed: Seed = None):
         super(SingleNoiseGenerator, self).__init__(width, height)
 
-        generator = generator if generator is not None else PinkNoise(width, height)
+        generator = generator if generator is not None else PinkNoise(width, height, seed=seed)
 
         self.frame = generator.get_next_frame()
+        self.frame_version = 1
+        self.constant_value = getattr(generator, 'constant_value', None)
+
+    def __update__(self, dt=1) -> None:
+        # The frame never changes, so the consumers can skip all the work they have done for it
+        self.changed = False
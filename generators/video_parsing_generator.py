@@ -1,6 +1,15 @@
+import struct
+from collections import OrderedDict
+from os import stat
+from os.path import exists
+from queue import Queue
+from threading import Thread, Event
+from typing import List
+
 import cv2
-from cv2 import VideoCapture, waitKey, CAP_PROP_FRAME_WIDTH, CAP_PROP_FRAME_HEIGHT
-from numpy import ndarray
+import numpy as np
+from cv2 import VideoCapture, waitKey, CAP_PROP_FRAME_WIDTH, CAP_PROP_FRAME_HEIGHT, CAP_PROP_FRAME_COUNT, \
+    CAP_PROP_FPS, CAP_PROP_POS_FRAMES
 
 from generators.noise_generator import NoiseGenerator
 
@@ -10,36 +19,315 @@ class VideoParsingGenerator(NoiseGenerator):
 
     Width and Height of the noise is derived from the video file.
 
+    Every update takes next frame of the video. The videos are expected to be greyscale, so only the first channel
+    is used. If `prefetch` is set, a reader thread decodes the frames ahead into a ring of preallocated buffers,
+    so the consumer only waits if it's faster than the decoder. Reading past the end of the video raises `ValueError`.
+
     Parameters
     ----------
     file_name : str
         Name of the video file.
+
+    live : bool, optional
+        If set every update waits for `dt` seconds (for the video to be played in real time). Defaults to True.
+
+    fps : int, optional
+        Frame rate of the video.
+
+    prefetch : int, optional
+        Number of frames decoded in advance by the reader thread. Defaults to 0 (decoding on demand).
+
+    dtype : numpy dtype, optional
+        Floating point type of the frames. Defaults to `np.float64`.
+
+    fixed_range : bool, optional
+        If set the frames are scaled from the fixed [0, 255] range, otherwise every frame is divided by its max.
+        Defaults to False.
     """
 
-    def __init__(self, file_name, live=True, fps=30):
+    def __init__(self, file_name, live=True, fps=30, prefetch=0, dtype=np.float64, fixed_range=False):
         self.capture = VideoCapture(file_name)
 
         width = int(self.capture.get(CAP_PROP_FRAME_WIDTH))
         height = int(self.capture.get(CAP_PROP_FRAME_HEIGHT))
 
         self.live = live
+        self.dtype = np.dtype(dtype)
+        self.fixed_range = fixed_range
 
         self.capture.set(cv2.CAP_PROP_FPS, fps)
 
         super(VideoParsingGenerator, self).__init__(width, height)
         waitKey(0)
 
-    def get_next_frame(self, dt=1) -> ndarray:
-        if self.live:
-            waitKey(int(dt * 1000))
+        # The decoded image is reused as well, `VideoCapture.read` writes into it
+        self.image = None
+
+        self.thread = None
+        if prefetch > 0:
+            # One buffer is held by the consumer, one is being filled by the reader
+            self.free_buffers = Queue()
+            for _ in range(prefetch + 2):
+                self.free_buffers.put(np.empty((height, width), dtype=self.dtype))
+
+            self.ready_buffers = Queue()
+            self.stopped = Event()
+            self.thread = Thread(target=self.__read_ahead__, name='video-prefetch', daemon=True)
+            self.thread.start()
+
+    def __decode__(self, out: np.ndarray = None):
+        """Decodes next frame into `out` (a new array is created if not set). Returns None at the end of the video."""
         if not self.capture.isOpened():
-            raise ValueError
+            return None
 
-        _, all_channels_frame = self.capture.read()
+        read, self.image = self.capture.read(self.image)
+        if not read:
+            return None
 
         # TODO: this part relies on greyscale images
-        frame = all_channels_frame[:, :, 0]
-        return frame / frame.max()
+        channel = self.image[:, :, 0]
+        if out is None:
+            out = np.empty(channel.shape, dtype=self.dtype)
+
+        scale = 1 / 255 if self.fixed_range else 1 / max(int(channel.max()), 1)
+        np.multiply(channel, scale, out=out, casting='unsafe')
+
+        return out
+
+    def __read_ahead__(self):
+        try:
+            while not self.stopped.is_set():
+                buffer = self.free_buffers.get()
+                if buffer is None:
+                    break
+
+                frame = self.__decode__(buffer)
+                self.ready_buffers.put(frame)
+
+                if frame is None:
+                    break
+        except Exception as e:
+            self.ready_buffers.put(e)
+
+    def __update__(self, dt=1) -> None:
+        if self.live:
+            waitKey(int(dt * 1000))
+
+        if self.thread is None:
+            frame = self.__decode__()
+        else:
+            frame = self.ready_buffers.get()
+
+            if isinstance(frame, Exception):
+                self.ready_buffers.put(frame)
+                raise frame
+
+            if frame is not None:
+                # The previous frame can be reused once the new one is out
+                if self.frame is not None:
+                    self.free_buffers.put(self.frame)
+            else:
+                # The end of the stream stays the end of the stream for the following calls
+                self.ready_buffers.put(None)
+
+        if frame is None:
+            raise ValueError("There are no more frames in the video")
+
+        self.frame = frame
+
+    def close(self):
+        if getattr(self, 'thread', None) is not None:
+            self.stopped.set()
+            # Wakes up the reader if it waits for a free buffer
+            self.free_buffers.put(None)
+            self.thread.join()
+            self.thread = None
 
-    def __del__(self):
         self.capture.release()
+
+    def __del__(self):
+        self.close()
+
+
+# Flag of the `idx1` entries that marks keyframes
+AVIIF_KEYFRAME = 0x10
+AVI_INDEX_ENTRY = np.dtype([('id', 'S4'), ('flags', '<u4'), ('offset', '<u4'), ('size', '<u4')])
+
+
+def get_frame_index_file_name(file_name: str) -> str:
+    return file_name + '.index.npz'
+
+
+def read_avi_keyframes(file_name: str):
+    """ Reads flags of the video frames from the `idx1` chunk of an AVI file.
+
+    Returns a boolean array with one item per video frame (True for the keyframes)
+    or None if the file has no `idx1` chunk.
+    """
+    with open(file_name, 'rb') as file:
+        riff, _, form = struct.unpack('<4sI4s', file.read(12))
+        if riff != b'RIFF' or form != b'AVI ':
+            return None
+
+        while True:
+            header = file.read(8)
+            if len(header) < 8:
+                return None
+
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'idx1':
+                entries = np.frombuffer(file.read(size), dtype=AVI_INDEX_ENTRY)
+                break
+
+            # Chunks are padded to an even size
+            file.seek(size + (size & 1), 1)
+
+    # Video chunks are '##dc' (compressed) or '##db' (uncompressed), '##' being the number of the stream
+    ids = entries['id']
+    video = np.array([chunk_id[2:] in (b'dc', b'db') for chunk_id in ids], dtype=bool)
+    if not video.any():
+        return None
+
+    stream = ids[video][0][:2]
+    video &= np.array([chunk_id[:2] == stream for chunk_id in ids], dtype=bool)
+
+    return (entries['flags'][video] & AVIIF_KEYFRAME) > 0
+
+
+def build_frame_index(file_name: str, fps: float = None) -> dict:
+    """ Builds (or loads) the frame index of given video - positions of the keyframes and timestamps of the frames.
+
+    The index is stored next to the video (see `get_frame_index_file_name`) and it's built again only if the video
+    changed. If the video has no AVI index, every frame is treated as a keyframe and the seeking is left to OpenCV.
+    """
+    index_file_name = get_frame_index_file_name(file_name)
+    video_stat = stat(file_name)
+
+    if exists(index_file_name):
+        with np.load(index_file_name) as index:
+            if index['size'] == video_stat.st_size and index['mtime'] == video_stat.st_mtime:
+                return dict(index)
+
+    capture = VideoCapture(file_name)
+    fps = fps or capture.get(CAP_PROP_FPS) or 30
+    frame_count = int(capture.get(CAP_PROP_FRAME_COUNT))
+    capture.release()
+
+    keyframe_flags = read_avi_keyframes(file_name)
+    if keyframe_flags is None:
+        keyframe_flags = np.ones(frame_count, dtype=bool)
+
+    # The first frame has to be a keyframe - it's where the decoding starts anyway
+    keyframe_flags[:1] = True
+
+    index = {
+        'keyframes': np.flatnonzero(keyframe_flags),
+        'timestamps': np.arange(len(keyframe_flags)) / fps,
+        'fps': np.float64(fps),
+        'size': np.int64(video_stat.st_size),
+        'mtime': np.float64(video_stat.st_mtime),
+    }
+    np.savez(index_file_name, **index)
+
+    return index
+
+
+class IndexedVideoParsingGenerator(VideoParsingGenerator):
+    """ `VideoParsingGenerator` with random access to the frames.
+
+    The positions of the keyframes are read once per file into a sidecar index (see `build_frame_index`).
+    A frame is then decoded from the closest preceding keyframe instead of the start of the video,
+    and the recently decoded frames are kept in a small LRU cache. Reading the frames in sequence needs no seeking.
+    Frames returned by `get_frame` and `get_frames` are read-only.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the video file.
+
+    cache_size : int, optional
+        Number of decoded frames kept in the cache. Defaults to 32.
+
+    kwargs
+        Arguments of `VideoParsingGenerator` - all but `prefetch`, the frames are decoded on demand.
+
+    Attributes
+    ----------
+    frame_count : int
+        Number of frames in the video.
+
+    timestamps : ndarray
+        Time of every frame in seconds.
+    """
+
+    def __init__(self, file_name, cache_size=32, **kwargs):
+        kwargs.pop('prefetch', None)
+        super(IndexedVideoParsingGenerator, self).__init__(file_name, **kwargs)
+
+        index = build_frame_index(file_name, kwargs.get('fps'))
+        self.keyframes = index['keyframes']
+        self.timestamps = index['timestamps']
+        self.frame_count = len(self.timestamps)
+
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+        # Index of the frame `__decode__` reads next
+        self.position = 0
+        self.next_index = 0
+
+    def __decode_frame__(self, i: int) -> np.ndarray:
+        if i != self.position:
+            # The decoding has to start at a keyframe (the closest one at or before `i`), unless we are already there
+            keyframe = self.keyframes[np.searchsorted(self.keyframes, i, side='right') - 1]
+            if not keyframe <= self.position < i:
+                self.capture.set(CAP_PROP_POS_FRAMES, int(keyframe))
+                self.position = int(keyframe)
+
+        while True:
+            frame = self.__decode__()
+            if frame is None:
+                raise IndexError(f'Frame {i} is out of the video')
+
+            self.position += 1
+            frame.setflags(write=False)
+            self.__cache_frame__(self.position - 1, frame)
+
+            if self.position - 1 == i:
+                return frame
+
+    def __cache_frame__(self, i: int, frame: np.ndarray) -> None:
+        self.cache[i] = frame
+        self.cache.move_to_end(i)
+
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def get_frame(self, i: int) -> np.ndarray:
+        i = i + self.frame_count if i < 0 else i
+        if not 0 <= i < self.frame_count:
+            raise IndexError(f'Frame {i} is out of the video with {self.frame_count} frames')
+
+        frame = self.cache.get(i)
+        if frame is None:
+            return self.__decode_frame__(i)
+
+        self.cache.move_to_end(i)
+        return frame
+
+    def get_frames(self, frames: slice) -> List[np.ndarray]:
+        return [self.get_frame(i) for i in range(*frames.indices(self.frame_count))]
+
+    def get_frame_at(self, time: float) -> np.ndarray:
+        """Returns the frame shown at given time (in seconds)."""
+        return self.get_frame(max(0, int(np.searchsorted(self.timestamps, time, side='right')) - 1))
+
+    def __update__(self, dt=1) -> None:
+        if self.live:
+            waitKey(int(dt * 1000))
+
+        if self.next_index >= self.frame_count:
+            raise ValueError("There are no more frames in the video")
+
+        self.frame = self.get_frame(self.next_index)
+        self.next_index += 1
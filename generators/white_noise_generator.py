@@ -1,11 +1,99 @@
-from numpy.random import rand
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from numpy import ndarray
 
 from generators.noise_generator import StaticNoiseGenerator
+from utils.rng import Seed, get_seed_sequence, get_frame_rng
 
 
 class WhiteNoise(StaticNoiseGenerator):
     """ `StaticNoiseGenerator` that generates white noise images
+
+    The noise is uniform on the [-1, 1) interval. The frames are filled in place by `Generator.random(out=...)`,
+    so a frame costs no allocations if the caller passes its own buffer (`out`).
+
+    Parameters
+    ----------
+    width : int
+        Width of the generated noise
+
+    height : int
+        Height of the generated noise
+
+    seed : None, int, SeedSequence or Generator, optional
+        Seed of the noise. Every frame is drawn from its own stream derived from the seed and the frame index,
+        see `get_frame`.
+
+    dtype : numpy dtype, optional
+        Floating point type of the generated frames. Either `np.float64` (default) or `np.float32`.
+
+    threads : int, optional
+        Number of threads used by `get_frames`. The frames are split between the threads, every frame is still drawn
+        from its own stream, so the result doesn't depend on the number of threads. The thread pool is created by
+        the first `get_frames` call and reused until `close` is called. Defaults to 1.
+
+    Methods
+    -------
+    get_next_frame(out=None)
+        Gets next frame.
+
+    get_frames(n, out=None)
+        Gets a `(n, width, height)` stack of next `n` frames.
+
+    get_frame(index, out=None)
+        Gets the `index`-th frame of the sequence without moving the sequence on.
+
+    close()
+        Shuts the thread pool of `get_frames` down.
     """
 
-    def get_next_frame(self):
-        return (rand(self.width, self.height) * 2) - 1
+    def __init__(self, width, height, seed: Seed = None, dtype=np.float64, threads=1):
+        super(WhiteNoise, self).__init__(width, height)
+
+        self.seed_sequence = get_seed_sequence(seed)
+        self.dtype = np.dtype(dtype)
+        self.threads = threads
+        self.index = 0
+
+        self.pool = None
+
+    def get_frame(self, index: int, out: ndarray = None) -> ndarray:
+        if out is None:
+            out = np.empty((self.width, self.height), dtype=self.dtype)
+
+        get_frame_rng(self.seed_sequence, index).random(out=out, dtype=out.dtype)
+        out *= 2
+        out -= 1
+
+        return out
+
+    def get_frames(self, n=1, out: ndarray = None) -> ndarray:
+        if out is None:
+            out = np.empty((n, self.width, self.height), dtype=self.dtype)
+
+        indices = range(self.index, self.index + n)
+        self.index += n
+
+        if self.threads > 1 and n > 1:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.threads)
+
+            # The random fill releases the GIL, so the threads really run in parallel
+            list(self.pool.map(self.get_frame, indices, out))
+        else:
+            for index, frame in zip(indices, out):
+                self.get_frame(index, frame)
+
+        return out
+
+    def get_next_frame(self, out: ndarray = None) -> ndarray:
+        frame = self.get_frame(self.index, out)
+        self.index += 1
+
+        return frame
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
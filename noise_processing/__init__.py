@@ -3,6 +3,7 @@ from .heat_map_generator import HeatMapGenerator
 from .image_proceser import ImageProcesser
 from .noise_processor import NoiseProcessor
 from .noise_with_csv_output import NoiseGeneratorWithCSVOutput
+from .ssim_heat_map_generator import SSIMHeatMapGenerator, PatternSSIMHeatMapGenerator
 
 __all__ = [
     NoiseProcessor,
@@ -11,5 +12,7 @@ __all__ = [
     AvgDifferenceNoiseGenerator,
     DifferenceNoiseGenerator,
     PureDifferenceNoiseGenerator,
-    HeatMapGenerator
+    HeatMapGenerator,
+    SSIMHeatMapGenerator,
+    PatternSSIMHeatMapGenerator
 ]
@@ -13,14 +13,27 @@ class PureDifferenceNoiseGenerator(PersistentNoiseProcessor):
         super(PureDifferenceNoiseGenerator, self).__init__(generator)
 
         self.diff_function = diff_function
-        self.last_frame_noise = self.noise_generator.get_next_frame(0)
+        # A private copy - with the zero-copy protocol the frame of the generator gets overwritten by its next update
+        self.last_frame_noise = self.noise_generator.get_next_frame_mut(0)
+        self.last_frame_version = self.noise_generator.frame_version
+
+        # Versions of both compared frames and `dt` the current frame was computed from
+        self.diff_state = None
 
     def __update__(self, dt=1) -> None:
         self.new_frame_noise = self.noise_generator.get_next_frame(0)
 
+        # Once the input stops changing the difference is the same every update (eg. zero for a static scene)
+        state = (self.noise_generator.frame_version, self.last_frame_version, dt)
+        if self.frame is not None and state == self.diff_state:
+            self.changed = False
+            return
+        self.diff_state = state
+
         self.__process__(dt)
 
-        self.last_frame_noise = self.new_frame_noise
+        np.copyto(self.last_frame_noise, self.new_frame_noise)
+        self.last_frame_version = self.noise_generator.frame_version
 
     def __process__(self, dt=1) -> None:
         self.frame = self.diff_function(self.new_frame_noise, self.last_frame_noise)
@@ -1,51 +1,178 @@
 from math import ceil
+from typing import Callable
 
 import numpy as np
 
 from generators.noise_generator import NoiseGenerator
 from noise_processing.noise_processor import PersistentNoiseProcessor
-from utils.array import get_windows_indices
+from utils.array import get_windows_indices, get_windows_bounds, get_integral_image, get_window_sums
 
 
 class HeatMapGenerator(PersistentNoiseProcessor):
-    def __init__(self, generator: NoiseGenerator, process_function, window_size: int = 10, step: int = None,
-                 aggregate_function=None, compute_cached_values=None):
+    """ `NoiseProcessor` that maps a value of every window of the underlying noise into a heat map.
+
+    The windows are given by `get_windows_indices`. Their values are either computed by `process_function`
+    (called once per window) or by one of the built-in `STATISTICS`. The built-in statistics are computed for all
+    the windows at once from integral images of the frame and of its square, so their cost grows only with
+    the number of pixels - not with the window size or the number of windows.
+
+    Every `step` x `step` cell of the heat map has the average value of the four windows around it. The cells are
+    filled at once through a block view of a reused output buffer, so the frame is valid only until the next update.
+
+    Parameters
+    ----------
+    generator : NoiseGenerator
+        Generator of the processed noise.
+
+    process_function : Callable, optional
+        Function computing the value of one window from its bounds `(x1, x2, y1, y2)` (and `compute_cached_values`).
+        Required if `statistic` is not set.
+
+    window_size : int, optional
+        Size of the windows. Defaults to 10.
+
+    step : int, optional
+        Distance between the windows. Defaults to half of `window_size`.
+
+    aggregate_function : Callable, optional
+        Function called with the values of all the windows.
+
+    compute_cached_values : Callable, optional
+        Function returning keyword arguments of `process_function`, it's called once per frame.
+
+    statistic : str, optional
+        Name of the built-in statistic used instead of `process_function`:
+            - `sum`, `mean` - sum and mean of the pixels of the window
+            - `variance`, `rms_contrast` - variance and standard deviation of the pixels of the window
+            - `mean_abs_deviation` - absolute difference of the window mean and `reference`
+
+    reference : Callable[[], float], optional
+        Function returning the scene statistic `mean_abs_deviation` is computed against.
+        Defaults to the mean of the whole frame.
+
+    coarse : bool, optional
+        If set the frames are only the `(width_dim - 1, height_dim - 1)` grids of the cell values, without
+        the upsampling to the full resolution. Defaults to False.
+    """
+    STATISTICS = ('sum', 'mean', 'variance', 'rms_contrast', 'mean_abs_deviation')
+
+    def __init__(self, generator: NoiseGenerator, process_function=None, window_size: int = 10, step: int = None,
+                 aggregate_function=None, compute_cached_values=None, statistic: str = None,
+                 reference: Callable[[], float] = None, coarse=False):
         super(HeatMapGenerator, self).__init__(generator)
 
+        if statistic is None and process_function is None:
+            raise ValueError("Either the process function or the statistic has to be set")
+        if statistic is not None and statistic not in self.STATISTICS:
+            raise ValueError(f"The statistic {statistic} wasn't recognized. Try one of {list(self.STATISTICS)} instead")
+
         self.window_size = window_size
         self.step = step if step is not None else self.window_size // 2
         self.process_function = process_function
         self.aggregate_function = aggregate_function
         self.compute_cached_values = compute_cached_values
+        self.statistic = statistic
+        self.reference = reference
+        self.coarse = coarse
 
         self.height_dim = ceil(self.height / self.step) + 1
         self.width_dim = ceil(self.width / self.step) + 1
         self.value_windows = None
 
-    def __process__(self, dt=1) -> None:
+        # Buffers of the built-in statistics, allocated with the first frame
+        self.bounds = None
+        self.window_sizes = None
+        self.integral = None
+        self.squared_integral = None
+        self.squared_buffer = None
+
+        # Buffers of the heat map - the values of the cells and the full resolution map
+        self.cell_buffer = None
+        self.output_buffer = None
+
+    def __init_statistics__(self) -> None:
+        self.bounds = get_windows_bounds(self.frame.shape, self.window_size, self.window_size, self.step)
+        x1, x2, y1, y2 = self.bounds
+        self.window_sizes = np.outer(x2 - x1, y2 - y1)
+
+        integral_shape = (self.frame.shape[0] + 1, self.frame.shape[1] + 1)
+        self.integral = np.zeros(integral_shape)
+        if self.statistic in ('variance', 'rms_contrast'):
+            self.squared_integral = np.zeros(integral_shape)
+            self.squared_buffer = np.empty(self.frame.shape)
+
+    def get_window_statistics(self) -> np.ndarray:
+        """Returns the built-in statistic of all the windows as a `(width_dim, height_dim)` array."""
+        if self.bounds is None or self.integral.shape != (self.frame.shape[0] + 1, self.frame.shape[1] + 1):
+            self.__init_statistics__()
+
+        sums = get_window_sums(get_integral_image(self.frame, out=self.integral), self.bounds)
+        if self.statistic == 'sum':
+            return sums
+
+        # Empty windows (eg. the first one if `step` > `window_size`) have no mean, same as with `np.mean`
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / self.window_sizes
+
+            if self.statistic == 'mean':
+                return means
+
+            if self.statistic == 'mean_abs_deviation':
+                reference = self.reference() if self.reference is not None else self.frame.mean()
+                return np.abs(means - reference)
+
+            # The squares are centred by the frame mean, so the differences of the sums don't lose the precision
+            frame_mean = self.frame.mean()
+            np.subtract(self.frame, frame_mean, out=self.squared_buffer)
+            np.square(self.squared_buffer, out=self.squared_buffer)
+            squared_sums = get_window_sums(get_integral_image(self.squared_buffer, out=self.squared_integral),
+                                           self.bounds)
+
+            variance = squared_sums / self.window_sizes - (means - frame_mean) ** 2
+            np.maximum(variance, 0, out=variance)
+
+        return variance if self.statistic == 'variance' else np.sqrt(variance)
+
+    def get_window_values(self):
+        """Returns the values of all the windows of the current frame in the order of `get_windows_indices`."""
+        if self.statistic is not None:
+            return self.get_window_statistics().ravel()
+
         window_iterator = get_windows_indices(self.frame.shape, self.window_size, self.window_size, self.step)
         cached_values = self.compute_cached_values() if self.compute_cached_values else {}
 
-        flat_map = [self.process_function(*window, **cached_values) for window in window_iterator]
+        return [self.process_function(*window, **cached_values) for window in window_iterator]
+
+    def __process__(self, dt=1) -> None:
+        flat_map = self.get_window_values()
 
         self.aggregate_function and self.aggregate_function(np.array(flat_map))
 
         self.value_windows = np.reshape(flat_map, (self.width_dim, self.height_dim)).T
 
-        output_map = np.ones((self.width, self.height))
+        self.frame = self.__rasterise__(self.value_windows)
+
+    def __rasterise__(self, windows: np.ndarray) -> np.ndarray:
+        cells_shape = (windows.shape[0] - 1, windows.shape[1] - 1)
+        if self.cell_buffer is None or self.cell_buffer.shape != cells_shape:
+            self.cell_buffer = np.empty(cells_shape)
+            # Parts of the map not covered by any cell stay ones
+            self.output_buffer = np.ones((max(cells_shape[0] * self.step, self.width),
+                                          max(cells_shape[1] * self.step, self.height)))
 
-        for x in range(self.width_dim - 1):
-            width_offset = x * self.step
+        # Average of the four windows around every cell
+        cells = self.cell_buffer
+        np.add(windows[:-1, :-1], windows[1:, :-1], out=cells)
+        cells += windows[:-1, 1:]
+        cells += windows[1:, 1:]
+        cells /= 4
 
-            for y in range(self.height_dim - 1):
-                height_offset = y * self.step
+        if self.coarse:
+            return cells
 
-                output_map[
-                width_offset:width_offset + self.step,
-                height_offset:height_offset + self.step
-                ] *= (self.value_windows[x, y] +
-                      self.value_windows[x + 1, y] +
-                      self.value_windows[x, y + 1] +
-                      self.value_windows[x + 1, y + 1]) / 4
+        # `(cell x, pixel x, cell y, pixel y)` view of the covered part of the map, every cell is one block
+        covered = self.output_buffer[:cells_shape[0] * self.step, :cells_shape[1] * self.step]
+        blocks = covered.reshape(cells_shape[0], self.step, cells_shape[1], self.step)
+        blocks[...] = cells[:, np.newaxis, :, np.newaxis]
 
-        self.frame = output_map
+        return self.output_buffer[:self.width, :self.height]
@@ -1,3 +1,5 @@
+from typing import List
+
 from numpy import ndarray
 
 from generators.noise_generator import NoiseGenerator
@@ -17,21 +19,45 @@ class NoiseProcessor(NoiseGenerator):
     ----------
     frame : ndarray
 
+    skip_unchanged : bool
+        If set the processing is skipped while the frame of the underlying generator keeps its version
+        (see `NoiseGenerator.frame_version`) and the last processed frame is kept. Only for processors whose result
+        depends on nothing but the underlying frame. Defaults to False.
+
     Methods
     -------
     get_next_frame()
         Gets next frame.
     """
+    skip_unchanged = False
+    # Version of the frame of the underlying generator the current frame was processed from
+    processed_version = None
 
     def __init__(self, generator: NoiseGenerator):
         self.noise_generator = generator
         super(NoiseProcessor, self).__init__(self.noise_generator.width, self.noise_generator.height)
 
+    def get_inputs(self) -> List[NoiseGenerator]:
+        return [self.noise_generator]
+
     def __process__(self, dt=1) -> None:
         pass
 
+    def __is_input_unchanged__(self) -> bool:
+        version = self.noise_generator.frame_version
+        if self.skip_unchanged and self.frame is not None and version == self.processed_version:
+            self.changed = False
+            return True
+
+        self.processed_version = version
+        return False
+
     def __update__(self, dt=1) -> None:
-        self.frame = self.noise_generator.get_next_frame(dt)
+        frame = self.noise_generator.get_next_frame(dt)
+        if self.__is_input_unchanged__():
+            return
+
+        self.frame = frame
         self.__process__(dt)
 
 
@@ -55,5 +81,9 @@ class PersistentNoiseProcessor(NoiseProcessor):
 
     def __update__(self, dt=1) -> None:
         # This is the change from NoiseProcessor which also updates the noise_generator
-        self.frame = self.noise_generator.get_next_frame(0)
+        frame = self.noise_generator.get_next_frame(0)
+        if self.__is_input_unchanged__():
+            return
+
+        self.frame = frame
         self.__process__(dt)
@@ -0,0 +1,174 @@
+from typing import Callable
+
+import numpy as np
+
+from generators.noise_generator import NoiseGenerator
+from noise_processing.heat_map_generator import HeatMapGenerator
+from utils.array import get_filled_windows_origins, get_integral_image, get_window_sums, get_filled_window, \
+    get_filled_windows
+from utils.fft_backend import get_fft_backend
+from utils.image import ssim, ssim_from_moments, get_rms_contrast
+from utils.patch_compare import PatchComparator
+
+
+class SSIMHeatMapGenerator(HeatMapGenerator):
+    """ `HeatMapGenerator` whose window values are SSIM of the windows and one reference patch.
+
+    The windows cut by the frame border are padded with zeros by `value_fill` (see `get_filled_window`).
+    Every padded window is then one `window_size` x `window_size` crop of the zero-padded frame.
+
+    SSIM against one template needs only the moments of the windows and their cross-correlation with the template.
+    The means and variances of all the windows come from integral images (see `get_window_sums`) and
+    the cross-correlation at every window position from one FFT of the padded frame, so the cost of a frame doesn't
+    grow with the number of windows. The SSIM constants expect the dynamic range 1, if the frame isn't within [0, 1],
+    the patch has a bigger range or the windows can't be expressed as crops, every window is compared by `ssim`
+    instead.
+
+    Parameters
+    ----------
+    generator : NoiseGenerator
+        Generator of the processed noise.
+
+    get_patch : Callable[[], ndarray]
+        Function returning the reference patch. Its shape has to be `(window_size, window_size)`.
+
+    alpha, beta, gamma : float, optional
+        Weights of the luminance, contrast and structure comparison - see `ssim`.
+
+    kwargs
+        Arguments of `HeatMapGenerator` - all but `process_function` and `statistic`.
+    """
+
+    def __init__(self, generator: NoiseGenerator, get_patch: Callable[[], np.ndarray], alpha=1, beta=1, gamma=1,
+                 **kwargs):
+        super(SSIMHeatMapGenerator, self).__init__(generator, process_function=self.get_window_ssim, **kwargs)
+
+        self.get_patch = get_patch
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+
+        # The template and its spectrum are computed again only if `get_patch` returns a different patch
+        self.template = None
+        self.template_spectrum = None
+        self.template_moments = None
+
+        self.padded_frame = None
+        self.squared_frame = None
+        self.crop_bounds = None
+        self.frame_integral = None
+        self.squared_integral = None
+
+    def get_window_ssim(self, x1, x2, y1, y2) -> float:
+        """Compares one window - the per window path of `process_function`."""
+        window = get_filled_window(self.frame, x1, x2, y1, y2, self.window_size)
+
+        return ssim(window, self.get_patch(), alpha=self.alpha, beta=self.beta, gamma=self.gamma)
+
+    def __init_crops__(self) -> None:
+        shape = self.frame.shape
+        size = self.window_size
+
+        origins = get_filled_windows_origins(shape, size, self.step)
+
+        self.crop_bounds = None
+        if origins is not None:
+            x_origins, y_origins = origins
+            # The frame is padded by `size` on every side, so every crop is within the padded frame
+            self.crop_bounds = (x_origins + size, x_origins + 2 * size, y_origins + size, y_origins + 2 * size)
+
+        self.padded_frame = np.zeros((shape[0] + 2 * size, shape[1] + 2 * size))
+        self.squared_frame = np.empty_like(self.padded_frame)
+        self.frame_integral = np.zeros((shape[0] + 2 * size + 1, shape[1] + 2 * size + 1))
+        self.squared_integral = np.zeros_like(self.frame_integral)
+
+    def __update_template__(self, patch: np.ndarray) -> None:
+        self.template = patch
+        self.template_spectrum = np.conj(get_fft_backend().rfft2(patch, s=self.padded_frame.shape))
+        self.template_moments = (patch.mean(), get_rms_contrast(patch), np.ptp(patch))
+
+    def get_window_values(self):
+        patch = self.get_patch()
+        if patch.shape != (self.window_size, self.window_size):
+            raise ValueError(f"The patch of shape {patch.shape} doesn't match the window size {self.window_size}")
+
+        if self.padded_frame is None or self.padded_frame.shape[0] != self.frame.shape[0] + 2 * self.window_size \
+                or self.padded_frame.shape[1] != self.frame.shape[1] + 2 * self.window_size:
+            self.__init_crops__()
+            self.template = None
+
+        if patch is not self.template:
+            self.__update_template__(patch)
+
+        patch_mean, patch_contrast, patch_range = self.template_moments
+        # `value_fill` clips the windows at the border into [0, 1] and the zero padding is a part of them,
+        # so a frame within [0, 1] keeps the dynamic range of all the windows within 1 as well
+        if self.crop_bounds is None or self.frame.min() < 0 or self.frame.max() > 1 or patch_range > 1:
+            return super(SSIMHeatMapGenerator, self).get_window_values()
+
+        size = self.window_size
+        count = size * size
+        padded_frame = self.padded_frame
+        padded_frame[size:-size, size:-size] = self.frame
+        np.square(padded_frame, out=self.squared_frame)
+
+        means = get_window_sums(get_integral_image(padded_frame, out=self.frame_integral), self.crop_bounds) / count
+        squared_means = get_window_sums(get_integral_image(self.squared_frame, out=self.squared_integral),
+                                        self.crop_bounds) / count
+        contrasts = np.sqrt(np.maximum(squared_means - means ** 2, 0))
+
+        # Cross-correlation of the padded frame and the template - the crops never wrap around
+        fft = get_fft_backend()
+        correlation = fft.irfft2(fft.rfft2(padded_frame) * self.template_spectrum, s=padded_frame.shape)
+        x_origins, _, y_origins, _ = self.crop_bounds
+        cross = correlation[np.ix_(x_origins, y_origins)]
+
+        # Sample covariance, same as `covariance`
+        cov = (cross - count * means * patch_mean) / (count - 1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = ssim_from_moments(means, patch_mean, contrasts, patch_contrast, cov,
+                                       alpha=self.alpha, beta=self.beta, gamma=self.gamma)
+
+        return values.ravel()
+
+
+class PatternSSIMHeatMapGenerator(HeatMapGenerator):
+    """ `HeatMapGenerator` whose window values are the best matches of the windows with the patterns of a comparator.
+
+    All the windows of a frame (padded the same way as by `SSIMHeatMapGenerator`, see `get_filled_windows`) are
+    compared with all the patterns at once by `PatchComparator.get_best_ssim_matches`.
+
+    Parameters
+    ----------
+    generator : NoiseGenerator
+        Generator of the processed noise.
+
+    patch_comparator : PatchComparator
+        Comparator with the patterns of size `(window_size, window_size)`.
+
+    kwargs
+        Arguments of `HeatMapGenerator` - all but `process_function` and `statistic`.
+
+    Attributes
+    ----------
+    best_parameters : ndarray
+        Parameters of the best matching pattern of every window, `(count, 3)` array in the order of the windows.
+    """
+
+    def __init__(self, generator: NoiseGenerator, patch_comparator: PatchComparator, **kwargs):
+        super(PatternSSIMHeatMapGenerator, self).__init__(generator, process_function=self.get_window_match, **kwargs)
+
+        self.patch_comparator = patch_comparator
+        self.best_parameters = None
+
+    def get_window_match(self, x1, x2, y1, y2) -> float:
+        """Compares one window with the patterns - same as the values of `get_window_values`."""
+        window = get_filled_window(self.frame, x1, x2, y1, y2, self.window_size)
+        return self.patch_comparator.get_best_ssim_match(window)
+
+    def get_window_values(self):
+        windows = get_filled_windows(self.frame, self.window_size, self.step)
+        values, self.best_parameters = self.patch_comparator.get_best_ssim_matches(windows)
+
+        return values
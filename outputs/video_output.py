@@ -25,14 +25,30 @@ class VideoOutput(Output):
                 (secondary_output_generator, VideoWriter('.'.join(split_name), fourcc, float(fps), (width, height), 0))
             )
 
+        # Pairs (frame version, uint8 frame) of the last written secondary frames
+        self.written_frames = [(None, None)] * len(self.secondary_outputs)
+
+    def __get_secondary_frame__(self, i):
+        secondary_output_generator, _ = self.secondary_outputs[i]
+        frame = secondary_output_generator(0)
+
+        # Frames of one generator with the same version are the same frame (see `NoiseGenerator.frame_version`),
+        # so a frame that hasn't changed (eg. a heat map of a static scene) is converted only once
+        version = getattr(getattr(secondary_output_generator, '__self__', None), 'frame_version', None)
+        written_version, written_frame = self.written_frames[i]
+        if version is None or version != written_version:
+            written_frame = cast_to_uint8(frame)
+            self.written_frames[i] = version, written_frame
+
+        return written_frame
+
     def run(self):
         for i in range(self.FPS * self.length):
             frame = cast_to_uint8(self.get_next_frame(dt=1 / self.FPS))
             self.video.write(frame)
 
-            for secondary_output_generator, secondary_output_writer in self.secondary_outputs:
-                secondary_frame = cast_to_uint8(secondary_output_generator(0))
-                secondary_output_writer.write(secondary_frame)
+            for j, (_, secondary_output_writer) in enumerate(self.secondary_outputs):
+                secondary_output_writer.write(self.__get_secondary_frame__(j))
 
             if i % self.FPS == 0:
                 print(f'{i // self.FPS}s out of {self.length}')
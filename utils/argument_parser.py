@@ -3,6 +3,7 @@ import json
 from os import sep as separator
 from sys import argv
 
+from utils.fft_backend import set_fft_backend
 from utils.input_parser import get_noise
 from utils.simple_functions import nested_clear_override, nested_update, nested_replace
 
@@ -94,6 +95,12 @@ def prepare_app(args_source='json'):
         raise ValueError(
             f"Invalid value '{args_source}' for 'args_source' variable. Try 'json' or 'command line' instead.")
 
+    # The FFT backend has to be set before any of the generators is created
+    if 'fft' in output_args:
+        set_fft_backend(**output_args.pop('fft'))
+
+    # A `seed` key of the noise description takes precedence over the one of the output
+    args.setdefault('seed', output_args.pop('seed', None))
     noise_generator, _ = get_noise(output_args['width'], output_args['height'], **args)
 
     if not noise_generator:
@@ -1,12 +1,20 @@
 import numpy as np
-from numpy import fft
+
+from utils.fft_backend import get_fft_backend
+
+
+def check_writeable(array: np.ndarray):
+    """Raises `ValueError` if given array is read-only - eg. a frame of a generator using the zero-copy protocol."""
+    if not array.flags.writeable:
+        raise ValueError("The array is read-only and can't be changed in place. "
+                         "Use a copy of it instead (eg. `get_next_frame_mut`).")
 
 
 def normalize(array: np.ndarray, min_value=None, max_value=None):
     """ In place normalizes given array.
 
     Given array is normalized. After normalization the array will be within the [0, 1] interval.
-    Works in place!
+    Works in place! Read-only arrays are refused, use `get_normalized` for them.
 
     Parameters
     ----------
@@ -19,6 +27,8 @@ def normalize(array: np.ndarray, min_value=None, max_value=None):
     max_value : None or number
         Expected max of the GIVEN array - before normalization
     """
+    check_writeable(array)
+
     min_value = np.min(array) if min_value is None else min_value
     max_value = (np.max(array) if max_value is None else max_value)
 
@@ -55,16 +65,25 @@ def get_normalized(array: np.ndarray, min_value=None, max_value=None):
 
 
 def transform_to_probabilistic_distribution(array):
+    check_writeable(array)
     array /= array.sum()
 
 
 def cast_to_uint8(array, min_value=None, max_value=None, clip_min=None, clip_max=None):
+    """Returns given array normalized and cast to `uint8`. Given array is left untouched."""
+    if array.size and not any(array.strides):
+        # A constant broadcast frame (eg. `SingleColor`) - one pixel is converted instead of all of them
+        value = cast_to_uint8(array.flat[:1], min_value, max_value, clip_min, clip_max)[0]
+        return np.full(array.shape, value, dtype='uint8')
+
     if clip_min or clip_max:
         array = np.clip(array,
                         np.min(array) if clip_min is None else clip_min,
                         np.max(array) if clip_max is None else clip_max)
+        normalize(array, min_value, max_value)
+    else:
+        array = get_normalized(array, min_value, max_value)
 
-    normalize(array, min_value, max_value)
     array *= 255
 
     array = array.astype('uint8')
@@ -72,35 +91,53 @@ def cast_to_uint8(array, min_value=None, max_value=None, clip_min=None, clip_max
     return array
 
 
-# TODO: make the patch be applied centered
-def apply_patch(source, patch, x, y, contrast=0.5, overwrite=False):
-    max_right = source.shape[1]
-    max_top = source.shape[0]
-
-    patch_max_top = patch.shape[0]
-    patch_max_right = patch.shape[1]
+def get_patch_region(source_shape, patch_shape, x, y):
+    """ Returns slices of the region of the source and of the patch that overlap, if the patch is placed at `(x, y)`.
 
+    Returns None if the patch is completely outside of the source.
+    """
     bottom = max(x, 0)
     left = max(y, 0)
 
-    right = max(0, min(max_right, y + patch_max_right))
-    top = max(0, min(max_top, x + patch_max_top))
+    top = min(source_shape[0], x + patch_shape[0])
+    right = min(source_shape[1], y + patch_shape[1])
+
+    if bottom >= top or left >= right:
+        return None
+
+    source_region = (slice(bottom, top), slice(left, right))
+    patch_region = (slice(bottom - x, top - x), slice(left - y, right - y))
 
-    trimmed_patch = contrast * patch[max(0, -x): min(-x + max_top, patch_max_top),
-                               max(0, -y): min(-y + max_right, patch_max_right)]
+    return source_region, patch_region
+
+
+# TODO: make the patch be applied centered
+def apply_patch(source, patch, x, y, contrast=0.5, overwrite=False):
+    """ In place blends the patch into the source at position `(x, y)`.
+
+    Only the region of the source covered by the patch is touched (and clipped into the [0, 1] interval),
+    so the cost grows with the patch area and not with the source area. Patches completely outside of the source
+    are skipped.
+    """
+    check_writeable(source)
+
+    regions = get_patch_region(source.shape, patch.shape, x, y)
+    if regions is None:
+        return
+
+    source_region, patch_region = regions
+    region = source[source_region]
 
     if overwrite:
-        source[bottom:top, left:right] = trimmed_patch
+        np.multiply(patch[patch_region], contrast, out=region)
     else:
-        source[bottom:top, left:right] += trimmed_patch
+        region += contrast * patch[patch_region]
 
-    # In order for this function to work in place we have to rewrite
-    # elements of the `source` instead of rewriting the `source` variable itself
-    source[:] = np.clip(source, 0, 1)[:]
+    np.clip(region, 0, 1, out=region)
 
 
 def value_fill(array, x, y, desired_shape, value=1):
-    filled = np.ones(desired_shape) * value
+    filled = np.full(desired_shape, min(max(value, 0), 1), dtype=float)
     apply_patch(filled, array, x, y, contrast=1, overwrite=True)
 
     return filled
@@ -112,6 +149,115 @@ def get_windows_indices(array_shape, window_size_height=1, window_size_width=1,
             yield max(0, x), x + window_size_height, max(0, y), y + window_size_width
 
 
+def get_windows_bounds(array_shape, window_size_height=1, window_size_width=1, step=1):
+    """ Returns bounds `(x1, x2, y1, y2)` of the windows of `get_windows_indices` as four 1D arrays.
+
+    The windows are the products of the row ranges `x1[i]:x2[i]` and the column ranges `y1[j]:y2[j]`
+    in the same order as the ones of `get_windows_indices` (rows in the outer loop). The bounds are clipped
+    to the array, so they can be used for indexing of integral images (see `get_integral_image`).
+    """
+    xs = np.arange(-step, array_shape[0], step)
+    ys = np.arange(-step, array_shape[1], step)
+
+    x1 = np.maximum(xs, 0)
+    y1 = np.maximum(ys, 0)
+    x2 = np.clip(xs + window_size_height, x1, array_shape[0])
+    y2 = np.clip(ys + window_size_width, y1, array_shape[1])
+
+    return x1, x2, y1, y2
+
+
+def get_integral_image(array: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """ Returns the integral image (summed-area table) of given 2D array.
+
+    The integral image has one extra leading row and column of zeros, so `out[x, y]` is the sum of `array[:x, :y]`.
+    The sums are accumulated in `float64`, unless `out` of a different type is given.
+    """
+    shape = (array.shape[0] + 1, array.shape[1] + 1)
+    if out is None:
+        out = np.zeros(shape)
+    else:
+        out[0, :] = 0
+        out[:, 0] = 0
+
+    np.cumsum(array, axis=0, out=out[1:, 1:])
+    np.cumsum(out[1:, 1:], axis=1, out=out[1:, 1:])
+
+    return out
+
+
+def get_window_sums(integral: np.ndarray, bounds) -> np.ndarray:
+    """ Returns sums of all the windows with given bounds (see `get_windows_bounds`) from the integral image.
+
+    The result has shape `(len(x1), len(y1))` and every sum costs four lookups whatever the window size.
+    """
+    x1, x2, y1, y2 = bounds
+
+    return (integral[np.ix_(x2, y2)] - integral[np.ix_(x1, y2)]
+            - integral[np.ix_(x2, y1)] + integral[np.ix_(x1, y1)])
+
+
+def get_filled_window(array: np.ndarray, x1, x2, y1, y2, window_size: int) -> np.ndarray:
+    """ Returns the window `array[x1:x2, y1:y2]` padded with zeros to `window_size` x `window_size` by `value_fill`.
+
+    Windows cut at the start of the array are centred, the others are aligned to the start.
+    """
+    window = array[x1:x2, y1:y2]
+
+    if window.shape != (window_size, window_size):
+        x = window_size // 2 if window.shape[0] < window_size and x1 == 0 else 0
+        y = window_size // 2 if window.shape[1] < window_size and y1 == 0 else 0
+        window = value_fill(window, x, y, (window_size, window_size), value=0)
+
+    return window
+
+
+def get_filled_windows_origins(array_shape, window_size, step=1):
+    """ Returns origins of the windows of `get_filled_windows` within the array (as a pair of 1D arrays).
+
+    Every window of `get_windows_indices` padded by `value_fill` (centred if it's cut at the start of the array,
+    aligned to the start otherwise) is a `window_size` x `window_size` crop of the zero-padded array at these
+    origins. Returns None if some window doesn't contain all the pixels of its crop (eg. if `step` is more than
+    half of `window_size`) and the windows can't be cut from the padded array.
+    """
+    x1, x2, y1, y2 = get_windows_bounds(array_shape, window_size, window_size, step)
+
+    origins = []
+    for length, starts, ends in ((array_shape[0], x1, x2), (array_shape[1], y1, y2)):
+        axis_origins = starts - np.where((ends - starts < window_size) & (starts == 0), window_size // 2, 0)
+
+        if np.any(ends < np.minimum(length, axis_origins + window_size)):
+            return None
+
+        origins.append(axis_origins)
+
+    return tuple(origins)
+
+
+def get_filled_windows(array: np.ndarray, window_size: int, step=1) -> np.ndarray:
+    """ Returns all the windows of `get_windows_indices` padded to `window_size` x `window_size` by `value_fill`.
+
+    The windows are returned as one `(count, window_size, window_size)` stack in the order of `get_windows_indices`.
+    They are cut from a zero-padded copy of the array at once, unless they can't be (see
+    `get_filled_windows_origins`) or the array isn't within the [0, 1] interval (`value_fill` clips the values)
+    and every window is padded separately.
+    """
+    origins = get_filled_windows_origins(array.shape, window_size, step)
+
+    if origins is None or array.min() < 0 or array.max() > 1:
+        return np.array([get_filled_window(array, *window, window_size)
+                         for window in get_windows_indices(array.shape, window_size, window_size, step)], dtype=float)
+
+    padded = np.zeros((array.shape[0] + 2 * window_size, array.shape[1] + 2 * window_size))
+    padded[window_size:-window_size, window_size:-window_size] = array
+
+    x_origins, y_origins = origins
+    crops = np.lib.stride_tricks.sliding_window_view(padded, (window_size, window_size))
+    windows = crops[np.ix_(x_origins + window_size, y_origins + window_size)]
+
+    return windows.reshape(-1, window_size, window_size)
+
+
 def get_windows(array, window_size_height=1, window_size_width=1, step=1):
     return [array[x1:x2, y1, y2] for x1, x2, y1, y2 in
             get_windows_indices(array.shape, window_size_height, window_size_width, step)]
@@ -125,6 +271,7 @@ def get_windows(array, window_size_height=1, window_size_width=1, step=1):
 #  spectrum of the patch (minus its mean) and the Fourier amplitude spectrum of the target, where the two spectra are
 #  regarded as vectors.
 def get_similarity(image_a: np.ndarray, image_b: np.ndarray) -> np.ndarray:
+    fft = get_fft_backend()
     return np.dot(
         fft.rfft2(image_a),
         fft.rfft2(image_b)
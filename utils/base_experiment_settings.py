@@ -1,7 +1,9 @@
 import winsound
 from os import makedirs, chdir
-from os.path import exists
+from os.path import exists, abspath
 
+from generators.noise_bank_generator import NoiseBankGenerator, get_noise_bank_file_name
+from generators.pink_noise_generator import PinkNoise
 from noise_processing.noise_with_csv_output import NoiseGeneratorWithCSVOutput
 from outputs.video_output import VideoOutput
 from utils.updater import LinUpdater
@@ -28,6 +30,17 @@ def get_position_updater(patch_shift=(0, 0), patch_position=(0, 0)):
         return lambda dt: patch_position
 
 
+def get_pink_noise(width, height, seed=None):
+    """Returns pink noise generator for the experiments.
+
+    If there is a pre-rendered noise bank of given size in `noise_bank_folder` the frames are served from it.
+    The banks are created by `experiments/render_noise_bank.py`.
+    """
+    bank_file = get_noise_bank_file_name(width, height, seed, folder=noise_bank_folder)
+
+    return NoiseBankGenerator(bank_file, seed=seed) if exists(bank_file) else PinkNoise(width, height, seed=seed)
+
+
 def get_patch_value_updates(value, speed_of_change, initial_value=0):
     return [(value, LinUpdater(initial_value=initial_value, time_step=speed_of_change).update)]
 
@@ -46,6 +59,8 @@ def generate_experiment_output(output_name, generator, fields, outputs):
 
 
 results_folder = 'results'
+# Experiments change the working directory, hence the absolute path
+noise_bank_folder = abspath('noise_banks')
 
 base_size = 200
 length = 10
@@ -0,0 +1,280 @@
+from importlib.util import find_spec
+from threading import Lock
+from typing import Tuple, Union
+
+import numpy as np
+
+
+class FFTBackend:
+    """ Default FFT backend that uses `numpy.fft`.
+
+    All the spectral code (noise synthesis, gabor meshes, spectra comparison) calls the FFT through the currently
+    selected backend - see `get_fft_backend` and `set_fft_backend`. The backend can be swapped for a multi-threaded
+    one without touching any of the generators.
+
+    `numpy.fft` runs single threaded. It keeps its own cache of the twiddle factors for recently used sizes.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of threads used for a single transform. Ignored by the numpy backend.
+
+    Methods
+    -------
+    fft, fft2, ifft2, fftn, ifftn, rfft2, irfft2, rfftn, irfftn
+        Same signature as their `numpy.fft` counterparts.
+
+    fftfreq, rfftfreq, fftshift, ifftshift
+        Helper routines - these are cheap so every backend uses the `numpy.fft` ones.
+    """
+    name = 'numpy'
+    # Package the backend needs beyond numpy - it's checked by `set_fft_backend`
+    package = None
+
+    def __init__(self, workers: int = None):
+        self.workers = workers
+
+    def fft(self, a, n=None, axis=-1) -> np.ndarray:
+        return np.fft.fft(a, n=n, axis=axis)
+
+    def fft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return np.fft.fft2(a, s=s, axes=axes)
+
+    def ifft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return np.fft.ifft2(a, s=s, axes=axes)
+
+    def fftn(self, a, s=None, axes=None) -> np.ndarray:
+        return np.fft.fftn(a, s=s, axes=axes)
+
+    def ifftn(self, a, s=None, axes=None) -> np.ndarray:
+        return np.fft.ifftn(a, s=s, axes=axes)
+
+    def rfft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return np.fft.rfft2(a, s=s, axes=axes)
+
+    def irfft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return np.fft.irfft2(a, s=s, axes=axes)
+
+    def rfftn(self, a, s=None, axes=None) -> np.ndarray:
+        return np.fft.rfftn(a, s=s, axes=axes)
+
+    def irfftn(self, a, s=None, axes=None) -> np.ndarray:
+        return np.fft.irfftn(a, s=s, axes=axes)
+
+    @staticmethod
+    def fftfreq(n, d=1.0) -> np.ndarray:
+        return np.fft.fftfreq(n, d)
+
+    @staticmethod
+    def rfftfreq(n, d=1.0) -> np.ndarray:
+        return np.fft.rfftfreq(n, d)
+
+    @staticmethod
+    def fftshift(x, axes=None) -> np.ndarray:
+        return np.fft.fftshift(x, axes)
+
+    @staticmethod
+    def ifftshift(x, axes=None) -> np.ndarray:
+        return np.fft.ifftshift(x, axes)
+
+
+class ScipyFFTBackend(FFTBackend):
+    """ FFT backend that uses `scipy.fft`.
+
+    Every transform is split over `workers` threads. Single precision inputs stay in single precision.
+    Plans are cached by scipy itself (per shape and dtype).
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of threads used for a single transform. Negative values wrap around `os.cpu_count()`,
+        so -1 uses all the cores. Defaults to -1.
+    """
+    name = 'scipy'
+    package = 'scipy'
+
+    def __init__(self, workers: int = -1):
+        super(ScipyFFTBackend, self).__init__(workers)
+
+        import scipy.fft
+        self.module = scipy.fft
+
+    def fft(self, a, n=None, axis=-1) -> np.ndarray:
+        return self.module.fft(a, n=n, axis=axis, workers=self.workers)
+
+    def fft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return self.module.fft2(a, s=s, axes=axes, workers=self.workers)
+
+    def ifft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return self.module.ifft2(a, s=s, axes=axes, workers=self.workers)
+
+    def fftn(self, a, s=None, axes=None) -> np.ndarray:
+        return self.module.fftn(a, s=s, axes=axes, workers=self.workers)
+
+    def ifftn(self, a, s=None, axes=None) -> np.ndarray:
+        return self.module.ifftn(a, s=s, axes=axes, workers=self.workers)
+
+    def rfft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return self.module.rfft2(a, s=s, axes=axes, workers=self.workers)
+
+    def irfft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return self.module.irfft2(a, s=s, axes=axes, workers=self.workers)
+
+    def rfftn(self, a, s=None, axes=None) -> np.ndarray:
+        return self.module.rfftn(a, s=s, axes=axes, workers=self.workers)
+
+    def irfftn(self, a, s=None, axes=None) -> np.ndarray:
+        return self.module.irfftn(a, s=s, axes=axes, workers=self.workers)
+
+
+class FFTWBackend(FFTBackend):
+    """ FFT backend that uses FFTW through `pyfftw`.
+
+    FFTW plans are expensive to create but cheap to execute. The backend creates one plan per transform kind,
+    input shape, dtype and axes and reuses it for all consecutive calls.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of threads used for a single transform. Defaults to -1 (all the cores).
+
+    planner_effort : str, optional
+        FFTW planner flag. Defaults to 'FFTW_MEASURE'.
+    """
+    name = 'fftw'
+    package = 'pyfftw'
+
+    def __init__(self, workers: int = -1, planner_effort='FFTW_MEASURE'):
+        import os
+        import pyfftw.builders
+
+        super(FFTWBackend, self).__init__(workers if workers > 0 else (os.cpu_count() or 1))
+
+        self.builders = pyfftw.builders
+        self.planner_effort = planner_effort
+
+        self.plans = {}
+        # Plans are not thread safe as they own their input and output arrays
+        self.lock = Lock()
+
+    def __execute__(self, kind: str, a, s, axes) -> np.ndarray:
+        a = np.asarray(a)
+        axes = tuple(axes) if axes is not None else None
+        s = tuple(s) if s is not None else None
+        key = (kind, a.shape, a.dtype.str, s, axes)
+
+        with self.lock:
+            plan = self.plans.get(key)
+
+            if plan is None:
+                builder = getattr(self.builders, kind)
+                plan = builder(a, s=s, axes=axes, threads=self.workers, planner_effort=self.planner_effort,
+                               auto_align_input=True, auto_contiguous=True)
+                self.plans[key] = plan
+
+            # The output array belongs to the plan, so it has to be copied before the plan gets executed again
+            return plan(a).copy()
+
+    def fft(self, a, n=None, axis=-1) -> np.ndarray:
+        return self.__execute__('fftn', a, None if n is None else (n,), (axis,))
+
+    def fft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return self.__execute__('fftn', a, s, axes)
+
+    def ifft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return self.__execute__('ifftn', a, s, axes)
+
+    def fftn(self, a, s=None, axes=None) -> np.ndarray:
+        return self.__execute__('fftn', a, s, axes)
+
+    def ifftn(self, a, s=None, axes=None) -> np.ndarray:
+        return self.__execute__('ifftn', a, s, axes)
+
+    def rfft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return self.__execute__('rfftn', a, s, axes)
+
+    def irfft2(self, a, s=None, axes=(-2, -1)) -> np.ndarray:
+        return self.__execute__('irfftn', a, s, axes)
+
+    def rfftn(self, a, s=None, axes=None) -> np.ndarray:
+        return self.__execute__('rfftn', a, s, axes)
+
+    def irfftn(self, a, s=None, axes=None) -> np.ndarray:
+        return self.__execute__('irfftn', a, s, axes)
+
+
+FFT_BACKENDS = {
+    FFTBackend.name: FFTBackend,
+    ScipyFFTBackend.name: ScipyFFTBackend,
+    FFTWBackend.name: FFTWBackend,
+}
+
+__fft_backend = FFTBackend()
+
+
+def get_fft_backend() -> FFTBackend:
+    return __fft_backend
+
+
+def set_fft_backend(backend: Union[str, FFTBackend] = 'numpy', **kwargs) -> FFTBackend:
+    """ Sets the FFT backend used by all the spectral code.
+
+    Parameters
+    ----------
+    backend : str or FFTBackend
+        Either an instance of `FFTBackend` or one of the names 'numpy', 'scipy' or 'fftw'.
+
+    kwargs
+        Arguments passed to the backend constructor, eg. `workers`.
+
+    Raises
+    ------
+    ImportError
+        If the package the backend needs (scipy resp. pyfftw) isn't installed.
+
+    Returns
+    -------
+    The backend that has been set.
+    """
+    global __fft_backend
+
+    if isinstance(backend, str):
+        if backend not in FFT_BACKENDS:
+            raise ValueError(f"The FFT backend {backend} wasn't recognized. Try one of {list(FFT_BACKENDS)} instead")
+
+        backend_class = FFT_BACKENDS[backend]
+        if backend_class.package is not None and find_spec(backend_class.package) is None:
+            raise ImportError(f"The FFT backend {backend} needs the package {backend_class.package}, which isn't "
+                              f"installed. Install it (see requirements.txt) or use the 'numpy' backend instead")
+
+        backend = backend_class(**kwargs)
+
+    __fft_backend = backend
+    return __fft_backend
+
+
+def get_frequency_mesh(shape: Tuple[int, int], real=False, shift=False) -> Tuple[np.ndarray, np.ndarray]:
+    """ Creates meshes of sample frequencies for a 2D transform of given shape.
+
+    Parameters
+    ----------
+    shape : Tuple[int, int]
+        Shape of the transformed array.
+
+    real : bool, optional
+        If set the last axis holds only the non-negative frequencies - the layout of `rfft2`.
+
+    shift : bool, optional
+        If set the zero frequency is shifted into the center - the layout of `fftshift(fft2(...))`.
+    """
+    backend = get_fft_backend()
+
+    w = backend.fftfreq(shape[0])
+    h = backend.rfftfreq(shape[1]) if real else backend.fftfreq(shape[1])
+
+    if shift:
+        w = backend.fftshift(w)
+        h = h if real else backend.fftshift(h)
+
+    [mesh_h, mesh_w] = np.meshgrid(h, w)
+    return mesh_w, mesh_h
@@ -6,6 +6,8 @@ import pyglet
 import pyglet.gl
 from matplotlib.colors import Normalize
 
+from utils.fft_backend import get_fft_backend
+
 
 class ArrayImage:
     """Dynamic pyglet image of a 2d numpy array using matplotlib colormaps."""
@@ -132,7 +134,7 @@ def structural_similarity(image_a: np.ndarray, image_b: np.ndarray) -> [float]:
 
 
 def fourier_amplitude_spectrum(image: np.ndarray) -> np.ndarray:
-    return np.absolute(np.fft.fft(image - get_luminance(image)))
+    return np.absolute(get_fft_backend().fft(image - get_luminance(image)))
 
 
 def __phase_invariant_similarity(image_a: np.ndarray, image_b: np.ndarray, c=K2 ** 2 / 2) -> float:
@@ -182,7 +184,16 @@ def simple_combine(properties: [Tuple[float, float]]) -> float:
     # Weird hack to prevent `runtimewarning: invalid value encountered`
     # numpy has issue when powering high precision low number to power that's less than 1
     # see: https://stackoverflow.com/a/45384691
-    return np.product([np.sign(prop) * (np.abs(prop)) ** weight for prop, weight in properties])
+    return np.prod([np.sign(prop) * (np.abs(prop)) ** weight for prop, weight in properties])
+
+
+def combine_similarities(luminance, contrast, structure, alpha=1, beta=1, gamma=1):
+    """Element-wise `simple_combine` of arrays of the luminance, contrast and structure comparisons."""
+    result = 1
+    for prop, weight in ((luminance, alpha), (contrast, beta), (structure, gamma)):
+        result = result * np.sign(prop) * np.abs(prop) ** weight
+
+    return result
 
 
 def __ssim(image_a: np.ndarray, image_b: np.ndarray,
@@ -196,6 +207,22 @@ def ssim(image_a: np.ndarray, image_b: np.ndarray, alpha=1, beta=1, gamma=1) ->
     return __ssim(image_a, image_b, alpha=alpha, beta=beta, gamma=gamma)
 
 
+def ssim_from_moments(lum_a, lum_b, con_a, con_b, cov, alpha=1, beta=1, gamma=1, dynamic_range=1):
+    """ Returns SSIM of image pairs given by their moments - works element-wise on arrays of the moments.
+
+    Same as `ssim` (with `simple_combine`) for images with given luminances, RMS contrasts and covariance
+    (see `get_luminance`, `get_rms_contrast` and `covariance`).
+    """
+    stabilize_1 = (K1 * dynamic_range) ** 2
+    stabilize_2 = (K2 * dynamic_range) ** 2
+
+    luminance = __luminance_comparison(lum_a, lum_b, stabilize_1)
+    contrast = __contrast_comparison(con_a, con_b, stabilize_2)
+    structure = __structural_similarity(cov, con_a, con_b, stabilize_2 / 2)
+
+    return combine_similarities(luminance, contrast, structure, alpha, beta, gamma)
+
+
 def dssim(image_a: np.ndarray, image_b: np.ndarray) -> float:
     return (1 - ssim(image_a, image_b)) / 2
 
@@ -1,23 +1,26 @@
 from generators.circular_noise_generator import *
 from generators.continuous_noise_generator import *
 from generators.gabor_generator import *
+from generators.multi_patch_generator import *
 from generators.patched_noise_generator import *
 from generators.pink_noise_generator import *
 from generators.single_color_generator import *
+from generators.white_noise_generator import *
 from heat_map_generator import *
 from noise_processing.diff_noise_generator import *
 from noise_processing.image_proceser import *
-from utils.image import get_rms_contrast
+from utils.rng import spawn_seeds
+from utils.simple_functions import INTERPOLATIONS
 from utils.updater import *
 
 
-def get_updater(**kwargs):
+def get_updater(seed=None, **kwargs):
     if 'sin' in kwargs:
         return SinUpdater(**kwargs['sin'])
     elif 'circ' in kwargs:
         return CircularUpdater(**kwargs['circ'])
     elif 'brown' in kwargs:
-        return BrownianUpdater(**kwargs['brown'])
+        return BrownianUpdater(seed=seed, **kwargs['brown'])
     elif 'lin' in kwargs:
         return LinUpdater(**kwargs['lin'])
     elif 'none' in kwargs:
@@ -26,105 +29,139 @@ def get_updater(**kwargs):
         return NoUpdater()
 
 
-def get_position_updater(**kwargs):
-    x_updater = get_updater(**kwargs['x']) if 'x' in kwargs else NoUpdater()
-    y_updater = get_updater(**kwargs['y']) if 'y' in kwargs else x_updater
+def get_position_updater(seed=None, **kwargs):
+    x_seed, y_seed = spawn_seeds(seed, 2)
+    x_updater = get_updater(x_seed, **kwargs['x']) if 'x' in kwargs else NoUpdater()
+    y_updater = get_updater(y_seed, **kwargs['y']) if 'y' in kwargs else x_updater
 
     return lambda dt: (x_updater.update(dt), y_updater.update(dt))
 
 
-def get_value_updater(**kwargs):
-    updater = get_updater(**kwargs)
+def get_value_updater(seed=None, **kwargs):
+    updater = get_updater(seed, **kwargs)
     return updater.update
 
 
-def get_noise(width, height, **kwargs):
+def get_update_list(updates, seed=None):
+    update_list = []
+    for patch, update_seed in zip(updates, spawn_seeds(seed, len(updates))):
+        update_list.append((
+            patch.pop('value'),
+            get_value_updater(update_seed, **patch)
+        ))
+
+    return update_list
+
+
+def get_inner_noise(width, height, description: dict, seed=None):
+    """Creates the generator of a nested description. A `seed` key of the description overrides given `seed`."""
+    return get_noise(width, height, **{'seed': seed, **description})
+
+
+def get_noise(width, height, seed=None, **kwargs):
+    """ Creates the generator graph described by `kwargs`.
+
+    The `seed` (or a `seed` key on any level of the description) seeds the whole subgraph.
+    Every random node in the subgraph gets its own independent stream spawned from it.
+    """
+    seed = kwargs.pop('seed', seed)
+
     if 'white' in kwargs:
         kwargs.pop('white')
-        return WhiteNoise(width, height), kwargs
+        return WhiteNoise(width, height, seed=seed), kwargs
 
     elif 'pink' in kwargs:
         kwargs.pop('pink')
-        return PinkNoise(width, height), kwargs
+        return PinkNoise(width, height, seed=seed), kwargs
 
     elif 'single' in kwargs:
         specs = kwargs.pop('single')
         return SingleColor(width, height, **specs), kwargs
 
     elif 'diff' in kwargs:
-        generator, specs = get_noise(width, height, **kwargs.pop('diff'))
+        generator, specs = get_inner_noise(width, height, kwargs.pop('diff'), seed)
 
         # TODO: Fill in the missing diff function
         return DifferenceNoiseGenerator(generator=generator, **specs), kwargs
 
     elif 'heat' in kwargs:
-        generator, specs = get_noise(width, height, **kwargs.pop('heat'))
+        generator, specs = get_inner_noise(width, height, kwargs.pop('heat'), seed)
 
-        def process_function(x1, x2, y1, y2):
-            return get_rms_contrast(generator.get_next_frame(0)[x1:x2, y1:y2])
+        specs.setdefault('statistic', 'rms_contrast')
 
-        return HeatMapGenerator(generator=generator, process_function=process_function, **specs), kwargs
+        return HeatMapGenerator(generator=generator, **specs), kwargs
 
     elif 'process' in kwargs:
-        generator, specs = get_noise(width, height, **kwargs.pop('process'))
+        generator, specs = get_inner_noise(width, height, kwargs.pop('process'), seed)
 
         return ImageProcesser(generator=generator), kwargs
 
     elif 'circular' in kwargs:
-        generator, specs = get_noise(width, height, **kwargs.pop('circular'))
+        generator, specs = get_inner_noise(width, height, kwargs.pop('circular'), seed)
 
-        return CircularNoiseGenerator(width, height, generator=generator, **specs), kwargs
+        return CircularNoiseGenerator(width, height, generator=generator, seed=seed, **specs), kwargs
 
     elif 'continuous' in kwargs:
-        generator, specs = get_noise(width, height, **kwargs.pop('continuous'))
+        generator, specs = get_inner_noise(width, height, kwargs.pop('continuous'), seed)
 
         interpolation = interpolate
-        if 'interpolation' in kwargs:
+        if 'interpolation' in specs:
             interpolation_type = specs.pop('interpolation')
 
-            if interpolation_type != 'simple':
-                raise ValueError(
-                    f"The interpolation function {interpolation_type} wasn't recognized. Try using 'simple' instead")
+            if interpolation_type not in INTERPOLATIONS:
+                raise ValueError(f"The interpolation function {interpolation_type} wasn't recognized. "
+                                 f"Try one of {list(INTERPOLATIONS)} instead")
+
+            interpolation = INTERPOLATIONS[interpolation_type]
 
-        return ContinuousNoiseGenerator(width, height, generator=generator, interpolation=interpolation,
+        return ContinuousNoiseGenerator(width, height, generator=generator, interpolation=interpolation, seed=seed,
                                         **specs), kwargs
 
     elif 'patched' in kwargs:
-        generator, specs = get_noise(width, height, **kwargs.pop('patched'))
+        patches = kwargs['patched'].pop('patches', [])
+        background_seed, *patch_seeds = spawn_seeds(seed, 1 + len(patches))
+
+        generator, specs = get_inner_noise(width, height, kwargs.pop('patched'), background_seed)
 
         patch_generators = []
-        if 'patches' in specs:
-            for patch in specs.pop('patches'):
-                patch_generator, _ = get_noise(width, height, **patch)
-                patch_generators.append((patch_generator, get_position_updater(**patch)))
+        for patch, patch_seed in zip(patches, patch_seeds):
+            # The seed of the patch seeds both its generator and its position
+            generator_seed, position_seed = spawn_seeds(patch.pop('seed', patch_seed), 2)
+
+            patch_generator, _ = get_inner_noise(width, height, patch, generator_seed)
+            patch_generators.append((patch_generator, get_position_updater(position_seed, **patch)))
 
         return PatchedNoiseGenerator(width, height, generator=generator, patch_generators=patch_generators), kwargs
 
+    elif 'multi' in kwargs:
+        updates = kwargs['multi'].pop('updates', [])
+        background_seed, update_seed = spawn_seeds(seed, 2)
+
+        generator, specs = get_inner_noise(width, height, kwargs.pop('multi'), background_seed)
+        update_list = get_update_list(updates, update_seed)
+
+        return MultiPatchGenerator(width, height, generator=generator, update_list=update_list, **specs), kwargs
+
     elif 'gabor' in kwargs:
         specs = kwargs.pop('gabor')
 
-        update_list = []
-        if 'updates' in specs:
-            for patch in specs.pop('updates'):
-                update_list.append((
-                    patch.pop('value'),
-                    get_value_updater(**patch)
-                ))
+        update_list = get_update_list(specs.pop('updates', []), seed)
 
         return GaborGenerator(update_list=update_list, **specs), kwargs
 
     elif 'plaid' in kwargs:
         specs = kwargs.pop('plaid')
 
-        update_list = []
-        if 'updates' in specs:
-            for patch in specs.pop('updates'):
-                update_list.append((
-                    patch.pop('value'),
-                    get_value_updater(**patch)
-                ))
+        update_list = get_update_list(specs.pop('updates', []), seed)
 
         return PlaidGenerator(update_list=update_list, **specs), kwargs
 
+    elif 'compound' in kwargs:
+        specs = kwargs.pop('compound')
+
+        update_list = get_update_list(specs.pop('updates', []), seed)
+
+        return CompoundGratingGenerator(update_list=update_list, **specs), kwargs
+
     else:
         return None, kwargs
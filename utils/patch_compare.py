@@ -1,6 +1,12 @@
+from typing import Tuple
+
+import numpy as np
+
 from generators.gabor_generator import GaborGenerator, PlaidGenerator
-from utils.image import covariance, get_luminance, get_rms_contrast, \
-    __luminance_comparison, __contrast_comparison, __structural_similarity, __phase_invariant_similarity, simple_combine
+from utils.fft_backend import get_fft_backend
+from utils.image import __luminance_comparison, __contrast_comparison, __structural_similarity, \
+    __phase_invariant_similarity, combine_similarities, ssim_from_moments
+from utils.steerable_gabor import SteerableGaborBasis
 from utils.updater import LinUpdater
 
 luminance_comparison = __luminance_comparison
@@ -10,6 +16,53 @@ phase_invariant_similarity = __phase_invariant_similarity
 
 
 class PatchComparator:
+    """ Finds the pattern (gabor or plaid patch) most similar to given images.
+
+    The bank of the patterns is generated once - `granularity + 1` patterns per every parameter (theta, phase and
+    frequency). The patterns are stored as rows of a mean-centred `(K, P)` matrix (K patterns of P pixels) together
+    with their luminances and contrasts. As the rows are centred, the covariances of any number of images with all
+    the patterns are one matrix product of the flattened images and the bank. For the phase invariant comparison
+    (`simple=False`) the bank holds the Fourier amplitude spectra of the patterns instead.
+
+    In the `steerable` mode there is no bank. The orientation and phase of the gabor patch (of the frequency `freq`)
+    responding the most to the image are solved for by a `SteerableGaborBasis` and the image is compared with that
+    patch only - the angular resolution is not limited by `granularity`.
+
+    Parameters
+    ----------
+    deg : float
+        Size of the patterns in degrees.
+
+    ppd : int
+        Pixels per one degree.
+
+    detect_gabor : bool, optional
+        Compares with gabor patches if set, with plaids otherwise. Defaults to True.
+
+    granularity : int, optional
+        Number of steps of every parameter.
+
+    freq_max : float, optional
+        The highest frequency of the patterns.
+
+    alpha, beta, gamma : float, optional
+        Weights of the luminance, contrast and structure comparison - see `ssim`.
+
+    simple : bool, optional
+        Compares the structure by covariance if set, by `phase_invariant_similarity` otherwise.
+
+    steerable : bool, optional
+        Finds the best orientation and phase by `SteerableGaborBasis`. Only for gabor patches and `simple`
+        comparison. Defaults to False.
+
+    freq : float, optional
+        Frequency of the patches of the `steerable` mode. Defaults to 6.
+
+    Attributes
+    ----------
+    parameters : ndarray
+        `(K, 3)` array of the values of `PARAMETERS` of every pattern. Not set in the `steerable` mode.
+    """
     K1 = 0.01
     K2 = 0.03
     # Thanks to pre-generated patterns we can fix the dynamic at 1
@@ -18,8 +71,10 @@ class PatchComparator:
     C1 = (K1 * DYNAMIC_RANGE) ** 2
     C2 = (K2 * DYNAMIC_RANGE) ** 2
 
+    PARAMETERS = ('freq', 'theta', 'phase')
+
     def __init__(self, deg, ppd, detect_gabor=True, granularity=100, freq_max=100,
-                 alpha=1, beta=1, gamma=1, simple=True):
+                 alpha=1, beta=1, gamma=1, simple=True, steerable=False, freq=6):
         #  Theta and Phase are periodical values that are repeated after 180 degrees resp 1 phase
         #  Freq can go possibly to infinity. Value 100 is chosen to fit the experiment
         update_list = {
@@ -34,7 +89,16 @@ class PatchComparator:
 
         self.simple = simple
 
-        self.pattern_patches = []
+        self.steerable_basis = None
+        if steerable:
+            if not detect_gabor or not simple:
+                raise ValueError("The steerable mode supports only the simple comparison with gabor patches")
+
+            self.steerable_basis = SteerableGaborBasis(deg, ppd, freq=freq)
+            return
+
+        patterns = []
+        parameters = []
         for value, speed in update_list.items():
             update = (value, LinUpdater(initial_value=0, time_step=speed).update)
             patch_generator_constructor = GaborGenerator if detect_gabor else PlaidGenerator
@@ -42,31 +106,105 @@ class PatchComparator:
 
             # TODO: check the +1 - it might be redundant
             for i in range(granularity + 1):
-                patch = patch_generator.get_normalized_patch()
-                patch_luminance = get_luminance(patch)
-                patch_contrast = get_rms_contrast(patch)
-                self.pattern_patches.append((patch, patch_luminance, patch_contrast))
+                patterns.append(patch_generator.get_normalized_patch())
+                parameters.append([patch_generator.__dict__[name] for name in self.PARAMETERS])
 
                 patch_generator.get_next_frame()
 
-    def get_best_ssim_match(self, image):
-        image_luminance = get_luminance(image)
-        image_variance = get_rms_contrast(image)
-
-        return max([
-            self.__ssim(pattern_luminance, pattern_variance,
-                        image_luminance, image_variance,
-                        image, pattern)
-            for pattern, pattern_luminance, pattern_variance in self.pattern_patches
-        ])
-
-    def __ssim(self, pattern_luminance, pattern_contrast, image_luminance, image_contrast, image, pattern) -> float:
-        structure = structural_similarity(covariance(image, pattern), pattern_contrast, image_contrast,
-                                          self.C2 / 2) if self.simple else phase_invariant_similarity(image, pattern,
-                                                                                                      self.C2 / 2)
-
-        return simple_combine([
-            (luminance_comparison(pattern_luminance, image_luminance, self.C1), self.alpha),
-            (contrast_comparison(pattern_contrast, image_contrast, self.C2), self.beta),
-            (structure, self.gamma)
-        ])
+        self.patterns = np.array(patterns, dtype=float)
+        self.parameters = np.array(parameters, dtype=float)
+        self.pattern_shape = self.patterns.shape[1:]
+
+        flat_patterns = self.patterns.reshape(len(self.patterns), -1)
+        self.luminances = flat_patterns.mean(axis=1)
+        self.contrasts = flat_patterns.std(axis=1)
+
+        if self.simple:
+            self.bank = flat_patterns - self.luminances[:, np.newaxis]
+        else:
+            self.bank = self.get_amplitude_spectra(self.patterns)
+            self.bank_norms = np.linalg.norm(self.bank, axis=1)
+
+    @staticmethod
+    def get_amplitude_spectra(images: np.ndarray) -> np.ndarray:
+        """Returns the flattened `fourier_amplitude_spectrum` of every image of given `(N, w, h)` stack."""
+        centred = images - images.mean(axis=(1, 2), keepdims=True)
+        return np.absolute(get_fft_backend().fft(centred)).reshape(len(images), -1)
+
+    def get_ssim_matches(self, images: np.ndarray) -> np.ndarray:
+        """ Compares every image of given `(N, w, h)` stack with all the patterns.
+
+        Returns `(N, K)` array of the similarities - same values as `get_best_ssim_match` maximizes.
+        """
+        if self.steerable_basis is not None:
+            raise ValueError("There is no bank of patterns in the steerable mode")
+
+        images = np.asarray(images, dtype=float)
+        if images.shape[1:] != self.pattern_shape:
+            raise ValueError(f"The images of shape {images.shape[1:]} don't match the patterns {self.pattern_shape}")
+
+        flat_images = images.reshape(len(images), -1)
+        image_luminances = flat_images.mean(axis=1)[:, np.newaxis]
+        image_contrasts = flat_images.std(axis=1)[:, np.newaxis]
+
+        if self.simple:
+            # The patterns are centred, so the images don't have to be
+            covariances = (flat_images @ self.bank.T) / (flat_images.shape[1] - 1)
+            structure = structural_similarity(covariances, self.contrasts, image_contrasts, self.C2 / 2)
+        else:
+            amplitudes = self.get_amplitude_spectra(images)
+            inner = amplitudes @ self.bank.T
+            norms = np.linalg.norm(amplitudes, axis=1)[:, np.newaxis] * self.bank_norms
+            structure = (inner + self.C2 / 2) / (norms + self.C2 / 2)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return combine_similarities(luminance_comparison(self.luminances, image_luminances, self.C1),
+                                        contrast_comparison(self.contrasts, image_contrasts, self.C2),
+                                        structure, self.alpha, self.beta, self.gamma)
+
+    def get_best_ssim_matches(self, images: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Finds the most similar pattern for every image of given `(N, w, h)` stack.
+
+        Returns the `(N,)` similarities and the `(N, 3)` parameters (see `PARAMETERS`) of the best patterns.
+        """
+        if self.steerable_basis is not None:
+            return self.__get_steerable_matches__(images)
+
+        matches = self.get_ssim_matches(images)
+        best = np.argmax(matches, axis=1)
+
+        return matches[np.arange(len(best)), best], self.parameters[best]
+
+    def __get_steerable_matches__(self, images: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        basis = self.steerable_basis
+        images = np.asarray(images, dtype=float)
+
+        theta, phase, _ = basis.detect(images)
+        patterns = basis.render_patterns(theta, phase)
+
+        # Every image is compared with its own pattern only
+        flat_images = images.reshape(len(images), -1)
+        flat_patterns = patterns.reshape(len(patterns), -1)
+        image_luminances = flat_images.mean(axis=1)
+        pattern_luminances = flat_patterns.mean(axis=1)
+        covariances = np.einsum('ij,ij->i', flat_images - image_luminances[:, np.newaxis],
+                                flat_patterns - pattern_luminances[:, np.newaxis]) / (flat_images.shape[1] - 1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores = ssim_from_moments(pattern_luminances, image_luminances,
+                                       flat_patterns.std(axis=1), flat_images.std(axis=1), covariances,
+                                       self.alpha, self.beta, self.gamma, self.DYNAMIC_RANGE)
+
+        return scores, np.column_stack((np.full(len(theta), basis.freq, dtype=float), theta, phase))
+
+    def get_best_ssim_match(self, image, return_parameters=False):
+        """ Returns the similarity of the pattern most similar to given image.
+
+        If `return_parameters` is set a dict of the parameters of the pattern is returned as well.
+        """
+        scores, parameters = self.get_best_ssim_matches(np.asarray(image)[np.newaxis])
+
+        if return_parameters:
+            return scores[0], dict(zip(self.PARAMETERS, parameters[0].tolist()))
+
+        return scores[0]
@@ -0,0 +1,59 @@
+from typing import Union, List
+
+import numpy as np
+from numpy.random import Generator, SeedSequence, PCG64
+
+Seed = Union[None, int, SeedSequence, Generator]
+
+# Frame streams are derived with a two word spawn key suffix `(FRAME_STREAM_KEY, index)`,
+# so they can never collide with the child streams made by `SeedSequence.spawn` (one word suffix).
+FRAME_STREAM_KEY = 0xFFFFFFFF
+
+
+def get_seed_sequence(seed: Seed = None) -> SeedSequence:
+    """ Converts any accepted form of seed into a `SeedSequence`.
+
+    Parameters
+    ----------
+    seed : None, int, SeedSequence or Generator
+        `None` draws fresh entropy from the OS. A `Generator` is consumed to derive a new independent sequence.
+    """
+    if isinstance(seed, SeedSequence):
+        return seed
+
+    if isinstance(seed, Generator):
+        return SeedSequence(seed.integers(0, 2 ** 32, size=4, dtype=np.uint64).tolist())
+
+    return SeedSequence(seed)
+
+
+def get_rng(seed: Seed = None) -> Generator:
+    """Returns a `Generator` for given seed. A `Generator` passed in is returned untouched."""
+    if isinstance(seed, Generator):
+        return seed
+
+    return Generator(PCG64(get_seed_sequence(seed)))
+
+
+def spawn_seeds(seed: Seed, n: int) -> List[SeedSequence]:
+    """ Derives `n` independent child seeds - one for every node in the generator graph.
+
+    If `seed` is None, None is returned for every child, so they all stay randomly seeded.
+    """
+    if seed is None:
+        return [None] * n
+
+    return get_seed_sequence(seed).spawn(n)
+
+
+def get_frame_rng(seed_sequence: SeedSequence, index: int) -> Generator:
+    """ Returns the random stream of the `index`-th frame of a generator seeded with `seed_sequence`.
+
+    The stream depends only on the seed and the frame index. Any worker can therefore produce the `index`-th frame
+    on its own and get bit for bit the same result as a serial run.
+    """
+    frame_sequence = SeedSequence(seed_sequence.entropy,
+                                  spawn_key=(*seed_sequence.spawn_key, FRAME_STREAM_KEY, index),
+                                  pool_size=seed_sequence.pool_size)
+
+    return Generator(PCG64(frame_sequence))
@@ -10,6 +10,87 @@ def interpolate(val_a, val_b, percent):
     return val_a + (val_b - val_a) * percent
 
 
+def get_cosine_weight(percent):
+    return (1 - np.cos(np.pi * percent)) / 2
+
+
+def cosine_interpolate(val_a, val_b, percent):
+    return interpolate(val_a, val_b, get_cosine_weight(percent))
+
+
+def get_contrast_weights(percent):
+    angle = np.pi / 2 * percent
+    return np.cos(angle), np.sin(angle)
+
+
+def contrast_interpolate(val_a, val_b, percent):
+    """Interpolates around the mid gray (0.5) with weights whose squares sum to 1.
+
+    Two independent noises mixed that way keep their contrast (deviation) during the whole transition,
+    whereas the linear interpolation lowers it up to 1/sqrt(2) in the middle.
+    """
+    weight_a, weight_b = get_contrast_weights(percent)
+    return (val_a - 0.5) * weight_a + (val_b - 0.5) * weight_b + 0.5
+
+
+# Number of elements processed at once by the interpolation kernels, so a block stays in the cache between the passes
+INTERPOLATION_BLOCK_SIZE = 2 ** 15
+
+
+def get_row_blocks(array: np.ndarray):
+    rows = max(1, INTERPOLATION_BLOCK_SIZE // max(1, array[0].size))
+    for start in range(0, array.shape[0], rows):
+        yield slice(start, start + rows)
+
+
+def linear_kernel(origin, goal, delta, percent, out):
+    """ Writes linear interpolation of `origin` and `goal` into `out`.
+
+    The interpolation kernels are the allocation free counterparts of the interpolation functions.
+    They all share one signature, `delta` being the precomputed `goal - origin` which can be reused for the whole
+    transition. The arrays are processed in blocks of rows, so every pass over a block is served from the cache.
+    """
+    for rows in get_row_blocks(out):
+        block = out[rows]
+        np.multiply(delta[rows], percent, out=block)
+        block += origin[rows]
+
+    return out
+
+
+def cosine_kernel(origin, goal, delta, percent, out):
+    return linear_kernel(origin, goal, delta, get_cosine_weight(percent), out)
+
+
+def contrast_kernel(origin, goal, delta, percent, out):
+    weight_a, weight_b = get_contrast_weights(percent)
+
+    # a * origin + b * goal = (a + b) * (origin + b / (a + b) * delta) and a + b >= 1 on the whole transition
+    weight_sum = weight_a + weight_b
+    for rows in get_row_blocks(out):
+        block = out[rows]
+        np.multiply(delta[rows], weight_b / weight_sum, out=block)
+        block += origin[rows]
+        block *= weight_sum
+        block += 0.5 * (1 - weight_sum)
+
+    return out
+
+
+INTERPOLATIONS = {
+    'simple': interpolate,
+    'linear': interpolate,
+    'cosine': cosine_interpolate,
+    'contrast': contrast_interpolate,
+}
+
+INTERPOLATION_KERNELS = {
+    interpolate: linear_kernel,
+    cosine_interpolate: cosine_kernel,
+    contrast_interpolate: contrast_kernel,
+}
+
+
 def get_perc(min_value, max_value, val):
     return (val - min_value) / (max_value - min_value)
 
@@ -0,0 +1,181 @@
+from math import ceil
+from typing import Tuple
+
+import numpy as np
+
+from generators.gabor_generator import GaborGenerator
+from utils.fft_backend import get_fft_backend
+
+
+class SteerableGaborBasis:
+    """ Finds the orientation and phase of the gabor patch (of fixed frequency) most responding to given images.
+
+    The response of an image `W` to the gabor patch `G * sin(k * r(theta) + phase)` (see `GaborGenerator`) is
+    `Im(exp(i * phase) * E(theta))`, where `E(theta)` is the response to the complex (quadrature) filter
+    `G * exp(i * k * r(theta))`. By the Jacobi-Anger expansion `E` is a trigonometric polynomial of theta whose order
+    is bounded by `k` times the radius of the gauss cutout. So `2N + 1` complex filters at equally spaced orientations
+    (`order` N) determine `E` at every orientation. The best phase of one orientation is then `atan2` of the response
+    and the best orientation maximizes `|E(theta)|` - it's found on a grid given by `order` and refined by a few Newton
+    steps of the trigonometric polynomial. The cost depends only on the size of the basis, not on the required
+    angular resolution.
+
+    The filters are mean-centred, so the responses are the covariances of the patches and the images
+    (up to a constant) - the same quantity the structural comparison of `ssim` correlates.
+
+    Parameters
+    ----------
+    deg : float
+        Size of the patches in degrees.
+
+    ppd : int
+        Pixels per one degree.
+
+    freq : float, optional
+        Frequency of the patches. Defaults to 6 (same as `GaborGenerator`).
+
+    order : int, optional
+        Order N of the trigonometric polynomial. Defaults to the one derived from the Jacobi-Anger expansion.
+
+    newton_steps : int, optional
+        Number of Newton steps refining the best orientation. Defaults to 4.
+
+    Attributes
+    ----------
+    orientations : ndarray
+        Orientations of the `2N + 1` basis filters in radians.
+
+    basis : ndarray
+        The complex basis filters, `(2N + 1, w, h)` array.
+    """
+
+    def __init__(self, deg, ppd, freq=6, order: int = None, newton_steps=4):
+        self.generator = GaborGenerator(patch_size_deg=deg, ppd=ppd, freq=freq)
+        self.freq = freq
+        self.newton_steps = newton_steps
+
+        axis = self.generator.axis
+        gauss = self.generator.gauss
+        self.shape = gauss.shape
+
+        wave_number = freq * GaborGenerator.TWO_PI
+        if order is None:
+            # The Bessel functions J_n(z) vanish quickly for `n > z`, z being the wave number times the radius
+            radius = np.sqrt(np.max(np.add.outer(axis ** 2, axis ** 2)[gauss > 0], initial=0))
+            z = wave_number * radius
+            order = int(ceil(z + 3 * np.cbrt(z))) + 4
+        self.order = order
+
+        count = 2 * order + 1
+        self.orientations = np.arange(count) * (GaborGenerator.TWO_PI / count)
+        # Frequencies of the coefficients of `fft` of the responses
+        self.harmonics = get_fft_backend().fftfreq(count, 1 / count)
+
+        # `r(theta) = u * sin(theta) + v * cos(theta)`, u changes along the rows and v along the columns
+        rows = np.exp(1j * wave_number * np.outer(np.sin(self.orientations), axis))
+        columns = np.exp(1j * wave_number * np.outer(np.cos(self.orientations), axis))
+        basis = rows[:, :, np.newaxis] * columns[:, np.newaxis, :] * gauss
+        basis -= basis.mean(axis=(1, 2), keepdims=True)
+
+        self.basis = basis
+        self.flat_basis = basis.reshape(count, -1).T
+
+        # Orientations of the search grid within one period of `|E|` (180 degrees)
+        self.grid = np.arange(2 * count) * (np.pi / (2 * count))
+        self.grid_phasors = np.exp(1j * np.outer(self.grid, self.harmonics))
+
+    def get_responses(self, images: np.ndarray) -> np.ndarray:
+        """Returns `(N, 2N + 1)` responses of every image of given `(N, w, h)` stack to the basis filters."""
+        images = np.asarray(images, dtype=float)
+        if images.shape[1:] != self.shape:
+            raise ValueError(f"The images of shape {images.shape[1:]} don't match the basis {self.shape}")
+
+        return images.reshape(len(images), -1) @ self.flat_basis
+
+    def solve(self, responses: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Returns the best orientations (in degrees), phases and amplitudes of given basis responses.
+
+        The orientations are within [0, 180) and the phases within [0, 1) - same units as `GaborGenerator` uses.
+        The amplitude is the response of the best patch.
+        """
+        shape = responses.shape[:-1]
+        coefficients = get_fft_backend().fft(responses.reshape(-1, responses.shape[-1]), axis=-1) / responses.shape[-1]
+
+        # The best orientation of the grid
+        values = np.abs(coefficients @ self.grid_phasors.T)
+        theta = self.grid[np.argmax(values, axis=1)]
+        spacing = self.grid[1]
+
+        harmonics = self.harmonics
+        for _ in range(self.newton_steps):
+            phasors = coefficients * np.exp(1j * np.outer(theta, harmonics))
+            value = phasors.sum(axis=1)
+            first = (phasors * (1j * harmonics)).sum(axis=1)
+            second = (phasors * -(harmonics ** 2)).sum(axis=1)
+
+            # Derivatives of `|E(theta)|^2`
+            gradient = 2 * np.real(np.conj(value) * first)
+            curvature = 2 * (np.abs(first) ** 2 + np.real(np.conj(value) * second))
+
+            # Only steps towards a maximum and not further than the grid spacing
+            with np.errstate(invalid='ignore', divide='ignore'):
+                step = np.where(curvature < 0, -gradient / curvature, 0)
+            theta = theta + np.clip(step, -spacing, spacing)
+
+        value = (coefficients * np.exp(1j * np.outer(theta, harmonics))).sum(axis=1)
+
+        # `|E|` has the period of 180 degrees, `E(theta + pi)` is the complex conjugate of `E(theta)`
+        flipped = np.mod(theta, GaborGenerator.TWO_PI) >= np.pi
+        theta = np.mod(theta, np.pi)
+        value = np.where(flipped, np.conj(value), value)
+
+        # `Im(exp(i * phase) * E)` is the highest for `phase = pi / 2 - arg(E)`
+        phase = np.mod((np.pi / 2 - np.arctan2(value.imag, value.real)) / GaborGenerator.TWO_PI, 1)
+
+        return np.degrees(theta).reshape(shape), phase.reshape(shape), np.abs(value).reshape(shape)
+
+    def detect(self, images: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the best orientations, phases and amplitudes (see `solve`) of given `(N, w, h)` stack of images."""
+        return self.solve(self.get_responses(images))
+
+    def detect_frame(self, frame: np.ndarray, step=1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Returns the best orientations, phases and amplitudes (see `solve`) of the windows centred at every
+        `step`-th pixel of the frame.
+
+        The frame is padded with zeros. The responses of all the windows are computed by one FFT correlation
+        per basis filter, so the cost doesn't depend on the number of the windows either.
+        """
+        w, h = self.shape
+        padded = np.zeros((frame.shape[0] + 2 * w, frame.shape[1] + 2 * h))
+        padded[w:-w, h:-h] = frame
+
+        # Origins of the windows centred at the pixels within the padded frame
+        x_origins = np.arange(0, frame.shape[0], step) + w - w // 2
+        y_origins = np.arange(0, frame.shape[1], step) + h - h // 2
+
+        fft = get_fft_backend()
+        frame_spectrum = fft.fft2(padded)
+
+        responses = np.empty((len(x_origins), len(y_origins), len(self.basis)), dtype=complex)
+        for i, basis_filter in enumerate(self.basis):
+            # Correlation with a complex filter: `sum(Z[o + r] * B[r])` is the inverse of `F(Z) * conj(F(conj(B)))`
+            kernel_spectrum = np.conj(fft.fft2(np.conj(basis_filter), s=padded.shape))
+            correlation = fft.ifft2(frame_spectrum * kernel_spectrum)
+            responses[:, :, i] = correlation[np.ix_(x_origins, y_origins)]
+
+        return self.solve(responses)
+
+    def render_patterns(self, theta: np.ndarray, phase: np.ndarray) -> np.ndarray:
+        """ Returns `(N, w, h)` stack of the normalized patches with given orientations and phases.
+
+        The patches are the same as `GaborGenerator.get_normalized_patch` with the same parameters.
+        """
+        generator = self.generator
+        patches = GaborGenerator.render_frames(generator.axis, generator.gauss, self.freq, theta, phase)
+
+        # Same as `get_normalized` of every patch
+        minimum = patches.min(axis=(1, 2), keepdims=True)
+        maximum = patches.max(axis=(1, 2), keepdims=True)
+        patches -= np.where(minimum == maximum, 0, minimum)
+        patches /= np.where(minimum == maximum, np.maximum(maximum, 1), maximum - minimum)
+
+        return patches
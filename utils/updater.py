@@ -1,11 +1,19 @@
 import numpy as np
 
+from utils.rng import Seed, get_rng
 from utils.simple_functions import get_perc
 
 
 class Updater:
+    """ Base class of the value updaters.
+
+    The value can be a number or a numpy array. An array value is updated element-wise in one vectorised step,
+    which is how `MultiPatchGenerator` advances the parameters of all of its patches at once. An array (or a list)
+    value is copied into a new float array, so the array of the caller is never changed by the updates.
+    """
+
     def __init__(self, initial_time=0, initial_value=0):
-        self.value = initial_value
+        self.value = np.array(initial_value, dtype=float) if np.ndim(initial_value) else initial_value
         self.time = initial_time
 
     def __update_value__(self, dt=1):
@@ -29,8 +37,8 @@ class SinUpdater(Updater):
         self.period = period
 
         if ((initial_value is not None) and
-                (initial_value >= self.min) and
-                (initial_value <= self.max)):
+                np.all(np.asarray(initial_value) >= self.min) and
+                np.all(np.asarray(initial_value) <= self.max)):
             initial_value = initial_value
         else:
             initial_value = get_perc(self.min, self.max, 0.5)
@@ -51,19 +59,25 @@ class LinUpdater(Updater):
         super(LinUpdater, self).__init__(0, initial_value)
 
     def __update_value__(self, dt=1):
-        self.value += dt * self.time_step
+        self.value = self.value + dt * self.time_step
 
 
 class BrownianUpdater(Updater):
-    def __init__(self, time_step=1, initial_value=0):
+    def __init__(self, time_step=1, initial_value=0, seed: Seed = None):
         self.time_step = time_step
+        self.rng = get_rng(seed)
         super(BrownianUpdater, self).__init__(0, initial_value)
 
     def __update_value__(self, dt=1):
-        if np.random.random() > 0.5:
-            self.value += dt * self.time_step
+        if np.ndim(self.value) == 0:
+            if self.rng.random() > 0.5:
+                self.value += dt * self.time_step
+            else:
+                self.value -= dt * self.time_step
         else:
-            self.value -= dt * self.time_step
+            # Vectorised form - every element of the value takes its own random step
+            steps = np.where(self.rng.random(np.shape(self.value)) > 0.5, 1, -1)
+            self.value = self.value + steps * (dt * self.time_step)
 
 
 class CircularUpdater(SinUpdater):
@@ -72,18 +86,24 @@ class CircularUpdater(SinUpdater):
 
 
 class FlyUpdater(Updater):
-    def __init__(self, time_step=1, initial_value=0, randomness=0.1):
+    def __init__(self, time_step=1, initial_value=0, randomness=0.1, seed: Seed = None):
         self.time_step = time_step
         self.direction = 1
         self.randomness = randomness
+        self.rng = get_rng(seed)
         super(FlyUpdater, self).__init__(0, initial_value)
 
     def __update_value__(self, dt=1):
         # move in a direction and from time to time change it abruptly
-        if np.random.random() > self.randomness:
-            self.direction *= -1
+        if np.ndim(self.value) == 0:
+            if self.rng.random() > self.randomness:
+                self.direction *= -1
+        else:
+            # Vectorised form - every element of the value has its own direction
+            flips = self.rng.random(np.shape(self.value)) > self.randomness
+            self.direction = np.where(flips, -self.direction, self.direction)
 
-        self.value += dt * self.direction * self.time_step
+        self.value = self.value + dt * self.direction * self.time_step
 
 
 # TODO: create an updater that takes as an input two updaters and creates the output as a composite